@@ -76,6 +76,11 @@ class KeybindsWidget(ScrolledView):
             **kwargs,
         )
 
-    def show_all(self):
+        # Fetched ahead so the first open already has the binds
         self.loader.load_keybinds()
+
+    def show_all(self):
+        self.loader.load_keybinds(
+            lambda: self.arrange_viewport(self.search_entry.get_text())
+        )
         super().show_all()
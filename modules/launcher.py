@@ -5,14 +5,25 @@ from fabric.widgets.button import Button
 from fabric.widgets.label import Label
 from fabric.widgets.image import Image
 from fabric.widgets.box import Box
-from fabric.utils import get_desktop_applications
-from gi.repository import GdkPixbuf, GLib
+from gi.repository import Gdk, GdkPixbuf, GLib
 from utils.config import widget_config
+from utils.constants import CURRENCY_RATES_FILE
 from shared.scrolled_view import ScrolledView
 import utils.functions as helpers
 import subprocess
 from fabric.utils import logger
 from modules.calculator import Calculator
+from services.app_index import AppIndex
+from utils.icon_cache import IconCache
+from utils.search import SearchIndex
+from utils.usage import get_usage_tracker
+
+MAX_RESULTS = 50
+
+# Icons decoded in the background right after startup
+WARM_ICON_COUNT = 30
+
+CALCULATOR_USAGE_KEY = "calculator"
 
 
 class AppLauncher(ScrolledView):
@@ -21,9 +32,21 @@ class AppLauncher(ScrolledView):
         self.app_icon_size = config["app_icon_size"]
         self.show_descriptions = config["show_descriptions"]
 
-        # Pre-allocate list
-        self._all_apps: list = []
-        self.calculator = Calculator()
+        self.calculator = Calculator(currency_file=CURRENCY_RATES_FILE)
+        self.app_index = AppIndex()
+        self.icon_cache = IconCache()
+        self.usage = get_usage_tracker("launcher")
+
+        # Rebuilt once per index refresh, never per keystroke
+        self._search = SearchIndex(
+            name_func=lambda app: app.display_name,
+            text_func=lambda app: (
+                f"{app.name} {app.generic_name or ''} {' '.join(app.keywords)}"
+            ),
+            score_func=lambda app: self.usage.score(app.desktop_id),
+        )
+        self._search.rebuild(self.app_index.applications)
+        self.app_index.connect("changed", self._on_applications_changed)
 
         super().__init__(
             name="app-launcher",
@@ -41,20 +64,34 @@ class AppLauncher(ScrolledView):
             **kwargs,
         )
 
+        GLib.idle_add(self._warm_icons)
+
+    def _warm_icons(self) -> bool:
+        # The empty query lists the most used apps first
+        apps = self._search.search("", limit=WARM_ICON_COUNT)
+        self.icon_cache.warm(
+            (app.icon_name for app in apps),
+            self.app_icon_size,
+            self.get_scale_factor(),
+        )
+        return False
+
+    def _on_applications_changed(self, *_):
+        self._search.rebuild(self.app_index.applications)
+        # Entries were replaced, rows built for the old ones are never hit again
+        self.viewport.clear_cache()
+
     def _arrange_items(self, query: str) -> Iterator:
-        """Filter items based on query. Optimized for speed."""
+        """Filter items based on query, ranked by the search index."""
 
         if any(c.isdigit() for c in query):
             calc_result = self.calculator.calculate(query)
             if calc_result is not None:
                 yield ("calc", *calc_result)
 
-        query_cf = query.casefold()
-
-        for app in self._all_apps:
-            # _search_string is pre-computed. No string concatenation here!
-            if query_cf in app._search_string:
-                yield app
+        # An empty query lists every app, typed queries only the best matches
+        limit = MAX_RESULTS if query.strip() else None
+        yield from self._search.search(query, limit=limit)
 
     def _create_item_widget(self, item) -> Button:
         """Creates the UI row for a search result."""
@@ -64,13 +101,18 @@ class AppLauncher(ScrolledView):
 
         app = item
 
-        pixbuf = app.get_icon_pixbuf()
-        if pixbuf:
-            pixbuf = pixbuf.scale_simple(
-                self.app_icon_size,
-                self.app_icon_size,
-                GdkPixbuf.InterpType.BILINEAR,
-            )
+        # Empty placeholder until the icon is decoded in the background
+        icon = Image(h_align="start", size=self.app_icon_size)
+        icon.set_size_request(self.app_icon_size, self.app_icon_size)
+        scale = self.get_scale_factor()
+        pixbuf = self.icon_cache.request(
+            app.icon_name,
+            self.app_icon_size,
+            scale,
+            lambda pixbuf: self._set_icon(icon, pixbuf, scale),
+        )
+        if pixbuf is not None:
+            self._set_icon(icon, pixbuf, scale)
 
         labels_box = Box(orientation="v", spacing=2, v_align="center")
 
@@ -98,7 +140,7 @@ class AppLauncher(ScrolledView):
             orientation="h",
             spacing=12,
             children=[
-                Image(pixbuf=pixbuf, h_align="start", size=self.app_icon_size),
+                icon,
                 labels_box,
             ],
         )
@@ -106,7 +148,20 @@ class AppLauncher(ScrolledView):
         return Button(
             child=content_box,
             tooltip_text=app.description if self.show_descriptions else None,
-            on_clicked=lambda *_: (app.launch(), self.hide()),
+            on_clicked=lambda *_: self._launch(app),
+        )
+
+    def _launch(self, app):
+        if app.launch():
+            self.usage.record(app.desktop_id)
+        self.hide()
+
+    def _set_icon(self, image: Image, pixbuf: GdkPixbuf.Pixbuf | None, scale: int):
+        if pixbuf is None:
+            return
+        # Pixbufs are decoded at device scale, render them at logical size
+        image.set_from_surface(
+            Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
         )
 
     def _build_calc_row(self, item: Tuple) -> Button:
@@ -160,7 +215,10 @@ class AppLauncher(ScrolledView):
         return Button(
             child=content_box,
             tooltip_text=f"Copy result: {result}",
-            on_clicked=lambda *_: self._copy_to_clipboard(str(result)),
+            on_clicked=lambda *_: (
+                self.usage.record(CALCULATOR_USAGE_KEY),
+                self._copy_to_clipboard(str(result)),
+            ),
         )
 
     def _copy_to_clipboard(self, text: str):
@@ -181,18 +239,3 @@ class AppLauncher(ScrolledView):
 
         # Run in thread to not block UI
         helpers.run_in_thread(copy_task)
-
-    def show_all(self):
-        """Refreshes app list and pre-calculates search strings."""
-        apps = get_desktop_applications()
-
-        for app in apps:
-            if not self.show_descriptions:
-                app.description = ""
-
-            app._search_string = (
-                f"{app.display_name or ''} {app.name} {app.generic_name or ''}"
-            ).casefold()
-
-        self._all_apps = apps
-        super().show_all()
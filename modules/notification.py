@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from fabric.notifications import (
     Notification,
     NotificationAction,
@@ -10,28 +12,57 @@ from fabric.widgets.grid import Grid
 from fabric.widgets.label import Label
 from fabric.widgets.revealer import Revealer
 from fabric.widgets.wayland import WaylandWindow as Window
-from gi.repository import Gdk, GdkPixbuf, GLib
+from gi.repository import Gdk, GLib
 
 import utils.constants as constants
 import utils.functions as helpers
 from services import notification_service
+from services.notification_images import NotificationImages
 from shared.widget_container import HoverButton
 from shared.circle_image import CircularImage
 from utils.icons import text_icons
 from utils.widget_settings import BarConfig
 from utils.widget_utils import get_icon, nerd_font_icon
 
+# Notifications arriving within one frame are rendered together
+FRAME_INTERVAL = 16
+
 
 class NotificationPopup(Window):
-    """A widget to grab and display notifications."""
+    """
+    A widget to grab and display notifications.
 
-    __slots__ = ("_server", "widget_config", "config", "ignored_apps", "notifications")
+    Incoming notifications are queued and rendered once per frame. A burst
+    from one app updates a single card with a counter instead of stacking a
+    popup per notification, and at most `max_popups` cards are on screen.
+    """
+
+    __slots__ = (
+        "_server",
+        "widget_config",
+        "config",
+        "ignored_apps",
+        "notifications",
+        "max_popups",
+        "_cards",
+        "_pending",
+        "_deferred",
+        "_flush_id",
+    )
 
     def __init__(self, widget_config: BarConfig, **kwargs):
         self._server = notification_service
         self.widget_config = widget_config
         self.config = widget_config["notification"]  # type: ignore
         self.ignored_apps = helpers.unique_list(self.config["ignored"])
+        self.max_popups = max(1, self.config.get("max_popups", 3))
+
+        # Cards on screen by app, least recently updated first
+        self._cards: Dict[str, NotificationRevealer] = {}
+        self._pending: List[Notification] = []
+        # Bursts that did not fit on screen in the previous frame
+        self._deferred: List[Notification] = []
+        self._flush_id = 0
 
         self.notifications = Box(
             v_expand=True,
@@ -57,19 +88,60 @@ class NotificationPopup(Window):
         if self._server.dont_disturb or notification.app_name in self.ignored_apps:
             return
 
-        new_box = NotificationRevealer(self.config, notification)
-        self.notifications.add(new_box)
-        new_box.set_reveal_child(True)
-
         logger.info(f"[Notification] New notification from {notification.app_name}")
         self._server.cache_notification(
             self.widget_config, notification, self.config["max_count"]
         )
 
-        if self.config.get("play_sound", False):
+        self._pending.append(notification)
+        if not self._flush_id:
+            self._flush_id = GLib.timeout_add(FRAME_INTERVAL, self._flush)
+
+    def _flush(self) -> bool:
+        self._flush_id = 0
+        deferred, self._deferred = self._deferred, []
+        pending, self._pending = self._pending, []
+
+        bursts: Dict[str, List[Notification]] = {}
+        for notification in deferred + pending:
+            bursts.setdefault(notification.app_name, []).append(notification)
+
+        new_cards = 0
+        for app_name, burst in bursts.items():
+            card = self._cards.pop(app_name, None)
+            if card is not None:
+                card.push(burst)
+                self._cards[app_name] = card
+                continue
+
+            # Apps beyond what fits on screen are shown on the next frame
+            if new_cards == self.max_popups:
+                self._deferred.extend(burst)
+                continue
+            new_cards += 1
+
+            while len(self._cards) >= self.max_popups:
+                self._cards.pop(next(iter(self._cards))).expire()
+
+            card = NotificationRevealer(self.config, burst)
+            card.connect("destroy", self._on_card_destroyed)
+            self._cards[app_name] = card
+            self.notifications.add(card)
+            card.set_reveal_child(True)
+
+        if self._deferred:
+            self._flush_id = GLib.timeout_add(FRAME_INTERVAL, self._flush)
+
+        # Deferred bursts already had their sound
+        if pending and self.config.get("play_sound", False):
             helpers.play_sound(
                 get_relative_path(f"../assets/sounds/{self.config['sound_file']}.mp3")
             )
+        return False
+
+    def _on_card_destroyed(self, card: "NotificationRevealer"):
+        if self._cards.get(card.app_name) is card:
+            del self._cards[card.app_name]
 
 
 class NotificationWidget(EventBox):
@@ -79,11 +151,13 @@ class NotificationWidget(EventBox):
         "config",
         "_notification",
         "_timeout_id",
+        "_destroyed",
+        "body_container",
         "notification_box",
         "actions_container_grid",
     )
 
-    def __init__(self, config, notification: Notification, **kwargs):
+    def __init__(self, config, notification: Notification, count: int = 1, **kwargs):
         super().__init__(
             size=(constants.NOTIFICATION_WIDTH, -1),
             name="notification-eventbox",
@@ -92,6 +166,7 @@ class NotificationWidget(EventBox):
         self.config = config
         self._notification = notification
         self._timeout_id = None
+        self._destroyed = False
 
         # Notification box
         self.notification_box = Box(
@@ -137,30 +212,15 @@ class NotificationWidget(EventBox):
             on_clicked=self.on_close_button_clicked,
         )
         header_container.pack_end(close_button, False, False, 0)
+        if count > 1:
+            header_container.pack_end(
+                Label(label=f"+{count - 1}", style_classes="count"), False, False, 0
+            )
 
         # Body
-        body_container = Box(
+        self.body_container = body_container = Box(
             spacing=4, orientation="h", style_classes="notification-body"
         )
-        try:
-            if pixbuf := notification.image_pixbuf:
-                body_container.add(
-                    CircularImage(
-                        pixbuf=pixbuf.scale_simple(
-                            constants.NOTIFICATION_IMAGE_SIZE,
-                            constants.NOTIFICATION_IMAGE_SIZE,
-                            GdkPixbuf.InterpType.BILINEAR,
-                        ),  # type: ignore
-                        h_expand=True,
-                        v_expand=True,
-                        size=constants.NOTIFICATION_IMAGE_SIZE,
-                        style_classes="image",
-                    )
-                )
-                del pixbuf
-        except GLib.Error:
-            logger.warning("[Notification] Image not available.")
-
         body_container.add(
             Label(
                 markup=helpers.parse_markup(notification.body),
@@ -202,10 +262,36 @@ class NotificationWidget(EventBox):
         )
         self.add(self.notification_box)
 
-        notification.connect("closed", lambda *_: (self.stop_timeout(), self.destroy()))
+        closed_handler = notification.connect(
+            "closed", lambda *_: (self.stop_timeout(), self.destroy())
+        )
+        # Replaced by a newer notification of a burst, the old one may close later
+        self.connect("destroy", lambda *_: self._on_destroy(closed_handler))
         if config.get("auto_dismiss", False):
             self.start_timeout()
 
+        # Scaled and stored once on the worker pool, shared with the history
+        NotificationImages().request(notification, self._on_image_ready)
+
+    def _on_destroy(self, closed_handler: int):
+        self._destroyed = True
+        self.stop_timeout()
+        self._notification.disconnect(closed_handler)
+
+    def _on_image_ready(self, _path: str | None, pixbuf):
+        if pixbuf is None or self._destroyed:
+            return
+        image = CircularImage(
+            pixbuf=pixbuf,  # type: ignore
+            h_expand=True,
+            v_expand=True,
+            size=constants.NOTIFICATION_IMAGE_SIZE,
+            style_classes="image",
+        )
+        self.body_container.add(image)
+        self.body_container.reorder_child(image, 0)
+        image.show()
+
     def on_close_button_clicked(self, *_):
         self._notification.close("dismissed-by-user")
         self.stop_timeout()
@@ -259,15 +345,36 @@ class NotificationWidget(EventBox):
 
 
 class NotificationRevealer(Revealer):
-    """Reveal a notification with transition."""
+    """
+    Reveal a notification with transition, stacking a burst from one app.
 
-    __slots__ = ("notification_box", "_notification")
+    Only the newest notification of a burst is shown, the earlier ones are
+    kept and closed along with it so none stays open on the server.
+    """
 
-    def __init__(self, config, notification: Notification, **kwargs):
-        self.notification_box = NotificationWidget(config, notification)
-        self._notification = notification
+    __slots__ = (
+        "notification_box",
+        "_notification",
+        "_closed_handler",
+        "_earlier",
+        "_config",
+        "_container",
+        "app_name",
+        "count",
+    )
+
+    def __init__(self, config, notifications: List[Notification], **kwargs):
+        self._config = config
+        self._notification = None
+        self._closed_handler = 0
+        # Earlier notifications of the burst and their closed handlers
+        self._earlier: Dict[Notification, int] = {}
+        self.notification_box = None
+        self.app_name = notifications[-1].app_name
+        self.count = 0
+        self._container = Box(style="margin: 12px;")
         super().__init__(
-            child=Box(style="margin: 12px;", children=[self.notification_box]),
+            child=self._container,
             transition_duration=config["transition_duration"],
             transition_type=config["transition_type"],
             **kwargs,
@@ -276,9 +383,57 @@ class NotificationRevealer(Revealer):
             "notify::child-revealed",
             lambda *_: self.destroy() if not self.get_child_revealed() else None,
         )
-        notification.connect(
-            "closed", lambda *_: (self.set_reveal_child(False), self.destroy())
+        self.push(notifications)
+
+    def push(self, notifications: List[Notification]):
+        """Show the newest of `notifications`, more from this app."""
+        if self._notification is not None:
+            self._notification.disconnect(self._closed_handler)
+            self.notification_box.destroy()
+            self._track(self._notification)
+        for notification in notifications[:-1]:
+            self._track(notification)
+
+        self.count += len(notifications)
+        self._notification = notifications[-1]
+        self.notification_box = NotificationWidget(
+            self._config, self._notification, count=self.count
         )
+        self._container.add(self.notification_box)
+        self._closed_handler = self._notification.connect("closed", self._on_closed)
+
+    def dismiss(self):
+        """Take the card off screen, its notifications stay open."""
+        if self._notification is not None:
+            self._notification.disconnect(self._closed_handler)
+            self._notification = None
+        for notification, handler in self._earlier.items():
+            notification.disconnect(handler)
+        self._earlier.clear()
+        self.set_reveal_child(False)
+        self.destroy()
+
+    def expire(self):
+        """Close the card's notifications as expired, which takes it off screen."""
+        if self._notification is not None:
+            # The closed handler dismisses the card and closes the earlier ones
+            self._notification.close("expired")
+
+    def _track(self, notification: Notification):
+        if notification not in self._earlier:
+            self._earlier[notification] = notification.connect(
+                "closed", self._on_earlier_closed
+            )
+
+    def _on_earlier_closed(self, notification: Notification, *_):
+        if (handler := self._earlier.pop(notification, None)) is not None:
+            notification.disconnect(handler)
+
+    def _on_closed(self, _notification: Notification, reason):
+        earlier = list(self._earlier)
+        self.dismiss()
+        for notification in earlier:
+            notification.close(reason)
 
 
 class ActionButton(HoverButton):
@@ -0,0 +1,319 @@
+import json
+import os
+import re
+from typing import Dict, NamedTuple, Tuple
+
+from fabric.utils import logger
+
+
+class Unit(NamedTuple):
+    """A unit alias: its dimension and how to bring a value to the base unit."""
+
+    dimension: str
+    # base = value * factor + offset
+    factor: float
+    offset: float = 0.0
+    # Shown in results instead of the alias
+    label: str | None = None
+
+
+# Launcher category of every dimension
+CATEGORIES = {
+    "temperature": "🌡️ Temperature",
+    "weight": "⚖️ Weight",
+    "volume": "🥤 Volume",
+    "length": "📏 Length",
+    "data": "💾 Data Size",
+    "time": "⏱️ Time",
+    "speed": "🚀 Speed",
+    "currency": "💱 Currency",
+}
+
+
+def _dimension(dimension: str, factors: Dict[str, float], **labels: str):
+    return {
+        alias: Unit(dimension, factor, label=labels.get(alias))
+        for alias, factor in factors.items()
+    }
+
+
+UNITS: Dict[str, Unit] = {
+    # Base unit: degree Celsius
+    "c": Unit("temperature", 1, label="°C"),
+    "f": Unit("temperature", 5 / 9, -160 / 9, label="°F"),
+    "kelvin": Unit("temperature", 1, -273.15, label="K"),
+    # Base unit: gram
+    **_dimension(
+        "weight",
+        {
+            "mg": 0.001,
+            "g": 1,
+            "kg": 1000,
+            "mt": 1000000,  # metric ton
+            "ton": 1000000,  # metric ton (default)
+            "tonne": 1000000,  # metric ton
+            "t": 1000000,  # metric ton
+            "lb": 453.592,
+            "lbs": 453.592,
+            "pound": 453.592,
+            "pounds": 453.592,
+            "ust": 907185,  # US ton (short ton)
+        },
+        pounds="lb",
+    ),
+    # Base unit: milliliter
+    **_dimension(
+        "volume",
+        {
+            "ml": 1,
+            "l": 1000,
+            "liter": 1000,
+            "liters": 1000,
+            "floz": 29.5735,  # US fluid ounce
+            "oz": 29.5735,  # fluid ounce
+            "cup": 236.588,  # US cup
+            "cups": 236.588,
+            "pint": 473.176,  # US pint
+            "pints": 473.176,
+            "quart": 946.353,  # US quart
+            "quarts": 946.353,
+            "gal": 3785.41,  # US gallon
+            "gallon": 3785.41,
+            "gallons": 3785.41,
+        },
+        floz="fl oz",
+    ),
+    # Base unit: meter
+    **_dimension(
+        "length",
+        {
+            "mm": 0.001,
+            "cm": 0.01,
+            "m": 1,
+            "km": 1000,
+            "in": 0.0254,
+            "inch": 0.0254,
+            "inches": 0.0254,
+            "ft": 0.3048,
+            "foot": 0.3048,
+            "feet": 0.3048,
+            "yd": 0.9144,
+            "yard": 0.9144,
+            "mi": 1609.344,
+            "mile": 1609.344,
+            "nmi": 1852,  # nautical mile
+        },
+    ),
+    # Base unit: byte
+    **_dimension(
+        "data",
+        {
+            "bit": 1 / 8,
+            "b": 1,
+            "byte": 1,
+            "kb": 1e3,
+            "mb": 1e6,
+            "gb": 1e9,
+            "tb": 1e12,
+            "kib": 2**10,
+            "mib": 2**20,
+            "gib": 2**30,
+            "tib": 2**40,
+        },
+        b="B",
+        kb="KB",
+        mb="MB",
+        gb="GB",
+        tb="TB",
+        kib="KiB",
+        mib="MiB",
+        gib="GiB",
+        tib="TiB",
+    ),
+    # Base unit: second
+    **_dimension(
+        "time",
+        {
+            "ms": 0.001,
+            "s": 1,
+            "sec": 1,
+            "second": 1,
+            "min": 60,
+            "minute": 60,
+            "h": 3600,
+            "hr": 3600,
+            "hour": 3600,
+            "day": 86400,
+            "week": 604800,
+            "year": 31557600,  # Julian year
+        },
+    ),
+    # Base unit: meter per second
+    **_dimension(
+        "speed",
+        {
+            "m/s": 1,
+            "km/h": 1 / 3.6,
+            "kmh": 1 / 3.6,
+            "kph": 1 / 3.6,
+            "mph": 0.44704,
+            "knot": 0.514444,
+        },
+    ),
+}
+
+# What a bare "<value> <unit>" converts to. With several candidates the
+# largest unit that keeps the value at or above 1 wins.
+COUNTERPARTS: Dict[str, Tuple[str, ...]] = {
+    "c": ("f",),
+    "f": ("c",),
+    **dict.fromkeys(("mg", "g", "kg", "mt", "ton", "tonne", "t"), ("lbs",)),
+    **dict.fromkeys(("lb", "lbs", "pound", "pounds", "ust"), ("kg",)),
+    **dict.fromkeys(("ml", "l", "liter", "liters"), ("floz",)),
+    **dict.fromkeys(
+        (
+            "floz",
+            "oz",
+            "cup",
+            "cups",
+            "pint",
+            "pints",
+            "quart",
+            "quarts",
+            "gal",
+            "gallon",
+            "gallons",
+        ),
+        ("l", "ml"),
+    ),
+}
+
+# One tokenizer for every dimension: value, unit and an optional target unit
+_QUERY = re.compile(
+    r"^(-?\d+\.?\d*)\s*°?\s*([a-z/]+)(?:\s+(?:to|in)\s+°?\s*([a-z/]+))?$"
+)
+
+
+def load_currency_units(path: str) -> Dict[str, Unit]:
+    """
+    Currency units from a local rates file.
+
+    The file holds `{"base": "EUR", "rates": {"USD": 1.08, ...}}`, every rate
+    being the amount of that currency one unit of the base buys. A missing or
+    malformed file means no currency units.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        base = data["base"].upper()
+        rates = {code.upper(): float(rate) for code, rate in data["rates"].items()}
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"[Units] Failed to load currency rates from {path}: {e}")
+        return {}
+
+    rates[base] = 1.0
+    return {
+        code.lower(): Unit("currency", 1 / rate, label=code)
+        for code, rate in rates.items()
+        if rate > 0
+    }
+
+
+def _format(value: float, unit: Unit, explicit: bool) -> str:
+    if unit.dimension == "temperature":
+        return f"{value:.2f}{unit.label}"
+    if unit.dimension == "currency" or not explicit:
+        return f"{value:.2f} {unit.label}"
+    # Thresholds for scientific notation
+    if value >= 1000000 or value < 0.01:
+        return f"{value:.2e} {unit.label}"
+    elif value < 1:
+        return f"{value:.4f} {unit.label}"
+    return f"{value:.2f} {unit.label}"
+
+
+class UnitConverter:
+    """
+    Converts "<value> <unit> [to|in <unit>]" queries between units.
+
+    Every unit alias maps to its dimension and factor, so a query is
+    tokenized once and resolved with dictionary lookups. Adding a unit or a
+    whole dimension is a table entry.
+    """
+
+    def __init__(self, currency_file: str | None = None):
+        self._currency_file = currency_file
+        self._currency_mtime = None
+        self._units = dict(UNITS)
+
+    def convert(self, query: str) -> Tuple[str, str] | None:
+        """Return the converted value and its dimension, None if not a conversion."""
+        match = _QUERY.match(query.strip().lower())
+        if match is None:
+            return None
+        number, source_alias, target_alias = match.groups()
+
+        if self._currency_file is not None:
+            self._reload_currencies()
+
+        source = self._resolve(source_alias)
+        if source is None:
+            return None
+        source_alias, source_unit = source
+        value = float(number)
+        # Only temperatures go below zero
+        if value < 0 and source_unit.dimension != "temperature":
+            return None
+        base = value * source_unit.factor + source_unit.offset
+
+        if target_alias is None:
+            candidates = [
+                self._resolve(alias)[1] for alias in COUNTERPARTS.get(source_alias, ())
+            ]
+            if not candidates:
+                return None
+            for target_unit in candidates:
+                result = (base - target_unit.offset) / target_unit.factor
+                if result >= 1:
+                    break
+            return _format(result, target_unit, False), source_unit.dimension
+
+        target = self._resolve(target_alias)
+        if target is None or target[1].dimension != source_unit.dimension:
+            return None
+        target_unit = target[1]
+
+        if target_unit.label == source_unit.label:
+            if target_unit.dimension == "temperature":
+                return f"{value}{target_unit.label}", target_unit.dimension
+            return f"{value} {target_unit.label}", target_unit.dimension
+
+        result = (base - target_unit.offset) / target_unit.factor
+        return _format(result, target_unit, True), target_unit.dimension
+
+    def _resolve(self, alias: str) -> Tuple[str, Unit] | None:
+        unit = self._units.get(alias)
+        if unit is None and alias.endswith("s"):
+            # Plurals such as "kgs" or "mins"
+            alias = alias[:-1]
+            unit = self._units.get(alias)
+            if unit is not None and unit.dimension == "temperature":
+                unit = None
+        if unit is None:
+            return None
+        if unit.label is None:
+            unit = unit._replace(label=alias)
+        return alias, unit
+
+    def _reload_currencies(self):
+        try:
+            mtime = os.stat(self._currency_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._currency_mtime:
+            return
+        self._currency_mtime = mtime
+
+        # Physical units win over currency codes such as CUP
+        self._units = {**load_currency_units(self._currency_file), **UNITS}
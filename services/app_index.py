@@ -0,0 +1,374 @@
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from fabric.core.service import Service, Signal
+from fabric.utils import logger, monitor_file
+from gi.repository import Gio, GLib
+
+from utils.constants import APP_INDEX_CACHE_FILE
+from utils.journal import write_atomic
+from utils.thread import run_in_thread
+
+# Bump whenever the record layout changes so stale caches are rebuilt
+CACHE_VERSION = 2
+
+# Delay before applying file monitor events, package managers touch many files
+RESCAN_DELAY_MS = 500
+
+
+def _application_directories() -> List[str]:
+    """XDG application directories, highest priority first."""
+    data_dirs = [GLib.get_user_data_dir(), *GLib.get_system_data_dirs()]
+    return list(dict.fromkeys(os.path.join(d, "applications") for d in data_dirs))
+
+
+# Keeps overlapping cache writes from sharing the temporary file
+_write_lock = threading.Lock()
+
+
+@run_in_thread
+def _write_cache(text: str):
+    with _write_lock:
+        try:
+            write_atomic(APP_INDEX_CACHE_FILE, text)
+        except OSError as e:
+            logger.warning(f"[AppIndex] Failed to write the cache: {e}")
+
+
+def _nearest_existing(path: str) -> str | None:
+    """`path` itself or its closest existing ancestor directory."""
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path
+
+
+def _walk_applications(
+    directory: str,
+) -> Tuple[List[Tuple[str, str, int]], List[str]]:
+    """
+    Desktop files below `directory` and the directories walked.
+
+    Files are returned as (desktop ID, path, mtime). Files in subdirectories
+    get the relative path as ID with "/" replaced by "-", as in the XDG menu
+    specification, so "kde/foo.desktop" is "kde-foo.desktop".
+    """
+    files: List[Tuple[str, str, int]] = []
+    directories: List[str] = []
+    # Real paths walked, symlinked directories must not loop
+    visited: set[str] = set()
+    stack = [(directory, "")]
+    while stack:
+        current, prefix = stack.pop()
+        real_path = os.path.realpath(current)
+        if real_path in visited:
+            continue
+        visited.add(real_path)
+        try:
+            with os.scandir(current) as it:
+                directories.append(current)
+                for dir_entry in it:
+                    try:
+                        if dir_entry.is_dir():
+                            stack.append((dir_entry.path, f"{prefix}{dir_entry.name}-"))
+                        elif dir_entry.name.endswith(".desktop"):
+                            mtime = dir_entry.stat().st_mtime_ns
+                            files.append(
+                                (prefix + dir_entry.name, dir_entry.path, mtime)
+                            )
+                    except OSError:
+                        # e.g. a dangling symlink
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[AppIndex] Failed to scan {current}: {e}")
+    return files, directories
+
+
+class AppEntry:
+    """A lightweight, cacheable view of a parsed .desktop file."""
+
+    __slots__ = (
+        "desktop_id",
+        "path",
+        "name",
+        "display_name",
+        "generic_name",
+        "description",
+        "executable",
+        "icon_name",
+        "keywords",
+        "hidden",
+        "mtime",
+    )
+
+    def __init__(self, record: Dict):
+        self.desktop_id: str = record["desktop_id"]
+        self.path: str = record["path"]
+        # Of the desktop file, an entry is reparsed when it differs
+        self.mtime: int | None = record.get("mtime")
+        self.name: str = record.get("name") or ""
+        self.display_name: str = record.get("display_name") or self.name
+        self.generic_name: str | None = record.get("generic_name")
+        self.description: str | None = record.get("description")
+        self.executable: str | None = record.get("executable")
+        self.icon_name: str | None = record.get("icon_name")
+        self.keywords: List[str] = record.get("keywords") or []
+        self.hidden: bool = record.get("hidden", False)
+
+    @classmethod
+    def from_file(
+        cls, desktop_id: str, path: str, mtime: int | None = None
+    ) -> "AppEntry | None":
+        """Parse a .desktop file, returns None if it is not a valid application."""
+        info = Gio.DesktopAppInfo.new_from_filename(path)
+        if info is None:
+            return None
+
+        icon = info.get_icon()
+        return cls(
+            {
+                "desktop_id": desktop_id,
+                "path": path,
+                "mtime": mtime,
+                "name": info.get_name(),
+                "display_name": info.get_display_name(),
+                "generic_name": info.get_generic_name(),
+                "description": info.get_description(),
+                "executable": info.get_executable(),
+                "icon_name": icon.to_string() if icon is not None else None,
+                "keywords": list(info.get_keywords() or []),
+                # Kept in the index so hidden overrides mask lower priority dirs
+                "hidden": not info.should_show(),
+            }
+        )
+
+    def to_record(self) -> Dict:
+        return {
+            "desktop_id": self.desktop_id,
+            "path": self.path,
+            "mtime": self.mtime,
+            "name": self.name,
+            "display_name": self.display_name,
+            "generic_name": self.generic_name,
+            "description": self.description,
+            "executable": self.executable,
+            "icon_name": self.icon_name,
+            "keywords": self.keywords,
+            "hidden": self.hidden,
+        }
+
+    def launch(self) -> bool:
+        """Launch the application, the desktop file is only parsed here."""
+        try:
+            info = Gio.DesktopAppInfo.new_from_filename(self.path)
+            if info is None:
+                logger.warning(f"[AppIndex] {self.path} is no longer launchable")
+                return False
+            return info.launch([], None)
+        except GLib.Error as e:
+            logger.error(f"[AppIndex] Failed to launch {self.desktop_id}: {e}")
+            return False
+
+
+class AppIndex(Service):
+    """
+    Persistent index of the installed desktop applications.
+
+    Parsed entries are cached on disk together with the mtime of their desktop
+    file. At startup the XDG application directories are walked, including
+    subdirectories, and only files whose mtime changed are parsed again. File
+    monitors keep the index current afterwards, so reading `applications`
+    never touches the filesystem. Directories that do not exist yet are
+    watched through their closest existing parent.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AppIndex, cls).__new__(cls)
+        return cls._instance
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted when the set of applications changes."""
+
+    def __init__(self, **kwargs):
+        if AppIndex._initialized:
+            return
+        AppIndex._initialized = True
+
+        super().__init__(**kwargs)
+
+        self._directories = _application_directories()
+        # directory -> {desktop_id -> AppEntry}
+        self._tables: Dict[str, Dict[str, AppEntry]] = {}
+        self._applications: List[AppEntry] = []
+
+        # application directory -> {watched path -> monitor}
+        self._monitors: Dict[str, Dict[str, Gio.FileMonitor]] = {}
+        self._pending_directories: set[str] = set()
+        self._rescan_timeout = 0
+
+        self._load()
+
+    @property
+    def applications(self) -> List[AppEntry]:
+        """Visible applications sorted by display name."""
+        return self._applications
+
+    def _read_cache(self) -> Dict:
+        if not os.path.exists(APP_INDEX_CACHE_FILE):
+            return {}
+        try:
+            with open(APP_INDEX_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[AppIndex] Ignoring unreadable cache: {e}")
+            return {}
+
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("directories", {})
+
+    def _load(self):
+        cached = self._read_cache()
+        dirty = False
+
+        for directory in self._directories:
+            previous = {
+                desktop_id: AppEntry(record)
+                for desktop_id, record in cached.get(directory, {})
+                .get("entries", {})
+                .items()
+            }
+            dirty |= self._scan_directory(directory, previous)
+
+        self._merge()
+        if dirty:
+            self._persist()
+
+    def _scan_directory(self, directory: str, previous: Dict[str, AppEntry]) -> bool:
+        """
+        Index `directory` again, reusing the entries of unchanged files.
+
+        Returns whether the table of the directory changed.
+        """
+        files, walked = _walk_applications(directory)
+        entries: Dict[str, AppEntry] = {}
+        parsed = 0
+        for desktop_id, path, mtime in files:
+            if desktop_id in entries:
+                continue
+            entry = previous.get(desktop_id)
+            if entry is None or entry.path != path or entry.mtime != mtime:
+                entry = AppEntry.from_file(desktop_id, path, mtime)
+                parsed += 1
+            if entry is not None:
+                entries[desktop_id] = entry
+
+        if parsed:
+            logger.info(f"[AppIndex] Parsed {parsed} application(s) in {directory}")
+        self._tables[directory] = entries
+        self._watch_directory(directory, walked)
+        return parsed > 0 or entries.keys() != previous.keys()
+
+    def _merge(self):
+        """Resolve desktop IDs across directories, first directory wins."""
+        resolved: Dict[str, AppEntry] = {}
+        for directory in self._directories:
+            for desktop_id, entry in self._tables.get(directory, {}).items():
+                resolved.setdefault(desktop_id, entry)
+
+        self._applications = sorted(
+            (entry for entry in resolved.values() if not entry.hidden),
+            key=lambda entry: entry.display_name.casefold(),
+        )
+
+    def _persist(self):
+        # Serialized here, the tables may change before the write runs
+        data = json.dumps(
+            {
+                "version": CACHE_VERSION,
+                "directories": {
+                    directory: {
+                        "entries": {
+                            desktop_id: entry.to_record()
+                            for desktop_id, entry in table.items()
+                        },
+                    }
+                    for directory, table in self._tables.items()
+                },
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        _write_cache(data)
+
+    def _watch_directory(self, directory: str, walked: List[str]):
+        """Watch every walked directory, or the closest parent if it is missing."""
+        if not walked:
+            parent = _nearest_existing(directory)
+            walked = [parent] if parent is not None else []
+
+        monitors = self._monitors.setdefault(directory, {})
+        for path in set(monitors) - set(walked):
+            monitors.pop(path).cancel()
+        for path in walked:
+            if path in monitors:
+                continue
+            try:
+                monitor = monitor_file(path)
+            except GLib.Error as e:
+                logger.warning(f"[AppIndex] Cannot watch {path}: {e}")
+                continue
+            monitor.connect("changed", self._on_directory_changed, directory)
+            monitors[path] = monitor
+
+    def _on_directory_changed(
+        self, _monitor, file: Gio.File, other_file, event, directory: str
+    ):
+        for changed in (file, other_file):
+            path = changed.get_path() if changed else None
+            if path and self._is_relevant(directory, path):
+                self._pending_directories.add(directory)
+
+        if self._pending_directories and not self._rescan_timeout:
+            self._rescan_timeout = GLib.timeout_add(
+                RESCAN_DELAY_MS, self._apply_pending_changes
+            )
+
+    def _is_relevant(self, directory: str, path: str) -> bool:
+        if path == directory or directory.startswith(path + os.sep):
+            # The application directory or one of its parents appeared or went
+            return True
+        if not path.startswith(directory + os.sep):
+            # A sibling next to a watched parent, e.g. other data directories
+            return False
+        # Skips caches such as mimeinfo.cache, but not subdirectories
+        return (
+            path.endswith(".desktop")
+            or os.path.isdir(path)
+            or path in self._monitors.get(directory, {})
+        )
+
+    def _apply_pending_changes(self) -> bool:
+        self._rescan_timeout = 0
+        directories, self._pending_directories = self._pending_directories, set()
+
+        changed = False
+        for directory in directories:
+            changed |= self._scan_directory(directory, self._tables.get(directory, {}))
+
+        if changed:
+            self._merge()
+            self._persist()
+            self.emit("changed")
+        return False
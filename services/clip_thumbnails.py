@@ -0,0 +1,237 @@
+import os
+import subprocess
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable
+
+from fabric.utils import logger
+from gi.repository import GdkPixbuf, GLib
+
+from services.cliphist import ClipHistory, ClipItem
+from utils.constants import CLIPHIST_THUMBNAIL_DIRECTORY
+from utils.thread import run_in_pool
+
+THUMBNAIL_SIZE = 72
+
+# Decoded thumbnails kept in memory, a 72px RGBA thumbnail is ~20 KiB
+MEMORY_BUDGET = 8 * 1024 * 1024
+
+# PNG thumbnails kept on disk across restarts
+DISK_BUDGET = 64 * 1024 * 1024
+
+# Keys of image file thumbnails, history item keys start with the item ID
+FILE_KEY_PREFIX = "file-"
+
+ThumbnailCallback = Callable[[GdkPixbuf.Pixbuf | None], None]
+
+
+def _fit(pixbuf: GdkPixbuf.Pixbuf, size: int) -> GdkPixbuf.Pixbuf:
+    width, height = pixbuf.get_width(), pixbuf.get_height()
+    scale = size / max(width, height)
+    if scale >= 1:
+        return pixbuf
+    return pixbuf.scale_simple(
+        max(1, round(width * scale)),
+        max(1, round(height * scale)),
+        GdkPixbuf.InterpType.BILINEAR,
+    )
+
+
+class ClipThumbnails:
+    """
+    Thumbnails for clipboard history images.
+
+    Images are decoded and scaled on the worker pool and stored as small PNGs
+    in the app cache directory, so reopening the menu or restarting the shell
+    does not decode the clipboard again. Both the in-memory and the on-disk
+    cache evict the least recently used thumbnails once over budget.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if ClipThumbnails._initialized:
+            return
+        ClipThumbnails._initialized = True
+
+        self._pixbufs: OrderedDict[str, GdkPixbuf.Pixbuf] = OrderedDict()
+        self._bytes = 0
+        self._pending: dict[str, list[ThumbnailCallback]] = {}
+        # Pending keys of items deleted meanwhile, their result is not kept
+        self._dropped: set[str] = set()
+
+        # file name -> size in bytes, least recently used first
+        self._files: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        run_in_pool(self._scan_directory)
+
+        history = ClipHistory()
+        history.connect("item-removed", lambda _, item_id: self.forget(item_id))
+        history.connect("wiped", lambda *_: self.clear())
+
+    @staticmethod
+    def key_for_item(item: ClipItem) -> str:
+        # IDs restart after a wipe, the preview tells apart different images
+        return f"{item.id}-{zlib.crc32(item.content.encode()):08x}"
+
+    def request(
+        self, item: ClipItem, callback: ThumbnailCallback
+    ) -> GdkPixbuf.Pixbuf | None:
+        """Return the cached thumbnail of a cliphist image or load it in background."""
+        return self._request(
+            self.key_for_item(item), self._decode_item, item.id, callback=callback
+        )
+
+    def request_file(
+        self, path: str, callback: ThumbnailCallback
+    ) -> GdkPixbuf.Pixbuf | None:
+        """Return the cached thumbnail of an image file or load it in background."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = f"{FILE_KEY_PREFIX}{zlib.crc32(path.encode()):08x}-{mtime}"
+        return self._request(key, self._decode_file, path, callback=callback)
+
+    def forget(self, item_id: str):
+        """Drop the thumbnails of a deleted history item."""
+        prefix = f"{item_id}-"
+        self._drop(lambda key: key.startswith(prefix))
+
+    def clear(self):
+        """Drop the thumbnails of every history item, image files are kept."""
+        self._drop(lambda key: not key.startswith(FILE_KEY_PREFIX))
+
+    def _drop(self, matches: Callable[[str], bool]):
+        for key in [key for key in self._pixbufs if matches(key)]:
+            self._bytes -= self._pixbufs.pop(key).get_byte_length()
+        self._dropped.update(key for key in self._pending if matches(key))
+        run_in_pool(self._remove_files, lambda name: matches(os.path.splitext(name)[0]))
+
+    def _request(self, key, decode, source, callback=None):
+        if (pixbuf := self._pixbufs.get(key)) is not None:
+            self._pixbufs.move_to_end(key)
+            return pixbuf
+
+        if key in self._pending:
+            if callback is not None:
+                self._pending[key].append(callback)
+            return None
+        self._pending[key] = [callback] if callback is not None else []
+        run_in_pool(self._load, key, decode, source)
+        return None
+
+    def _load(self, key: str, decode, source):
+        name = f"{key}.png"
+        path = os.path.join(CLIPHIST_THUMBNAIL_DIRECTORY, name)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+        except GLib.Error:
+            pixbuf = None
+
+        if pixbuf is not None:
+            with self._disk_lock:
+                if name in self._files:
+                    self._files.move_to_end(name)
+            try:
+                # Keeps the recency order across restarts
+                os.utime(path)
+            except OSError:
+                pass
+        else:
+            try:
+                pixbuf = decode(source)
+            except (OSError, GLib.Error, subprocess.CalledProcessError) as e:
+                logger.warning(f"[ClipThumbnails] Failed to decode {source}: {e}")
+            if pixbuf is not None:
+                self._store_file(name, path, pixbuf)
+
+        GLib.idle_add(self._finish, key, pixbuf)
+
+    def _decode_item(self, item_id: str) -> GdkPixbuf.Pixbuf | None:
+        data = subprocess.run(
+            ["cliphist", "decode", item_id], capture_output=True, check=True
+        ).stdout
+        loader = GdkPixbuf.PixbufLoader()
+        loader.write(data)
+        loader.close()
+        pixbuf = loader.get_pixbuf()
+        return _fit(pixbuf, THUMBNAIL_SIZE) if pixbuf is not None else None
+
+    def _decode_file(self, path: str) -> GdkPixbuf.Pixbuf | None:
+        return GdkPixbuf.Pixbuf.new_from_file_at_scale(
+            path, THUMBNAIL_SIZE, THUMBNAIL_SIZE, True
+        )
+
+    def _finish(self, key: str, pixbuf: GdkPixbuf.Pixbuf | None) -> bool:
+        if key in self._dropped:
+            # Deleted while loading, its file may have been written since
+            self._dropped.discard(key)
+            run_in_pool(self._remove_files, lambda name: name == f"{key}.png")
+        elif pixbuf is not None:
+            self._pixbufs[key] = pixbuf
+            self._bytes += pixbuf.get_byte_length()
+            while self._bytes > MEMORY_BUDGET and len(self._pixbufs) > 1:
+                _, evicted = self._pixbufs.popitem(last=False)
+                self._bytes -= evicted.get_byte_length()
+
+        for callback in self._pending.pop(key, []):
+            callback(pixbuf)
+        return False
+
+    def _scan_directory(self):
+        try:
+            with os.scandir(CLIPHIST_THUMBNAIL_DIRECTORY) as it:
+                files = [(entry.name, entry.stat()) for entry in it]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"[ClipThumbnails] Failed to scan thumbnails: {e}")
+            return
+
+        files.sort(key=lambda file: file[1].st_mtime_ns, reverse=True)
+        with self._disk_lock:
+            # Thumbnails stored since startup are newer than anything found here
+            for name, stat in files:
+                if name not in self._files:
+                    self._files[name] = stat.st_size
+                    self._files.move_to_end(name, last=False)
+                    self._disk_bytes += stat.st_size
+
+    def _store_file(self, name: str, path: str, pixbuf: GdkPixbuf.Pixbuf):
+        try:
+            os.makedirs(CLIPHIST_THUMBNAIL_DIRECTORY, exist_ok=True)
+            pixbuf.savev(path, "png", [], [])
+            size = os.path.getsize(path)
+        except (OSError, GLib.Error) as e:
+            logger.warning(f"[ClipThumbnails] Failed to save {path}: {e}")
+            return
+
+        with self._disk_lock:
+            self._disk_bytes += size - self._files.pop(name, 0)
+            self._files[name] = size
+            while self._disk_bytes > DISK_BUDGET and len(self._files) > 1:
+                evicted, evicted_size = self._files.popitem(last=False)
+                self._disk_bytes -= evicted_size
+                try:
+                    os.remove(os.path.join(CLIPHIST_THUMBNAIL_DIRECTORY, evicted))
+                except OSError:
+                    pass
+
+    def _remove_files(self, matches: Callable[[str], bool]):
+        with self._disk_lock:
+            names = [name for name in self._files if matches(name)]
+            for name in names:
+                self._disk_bytes -= self._files.pop(name)
+                try:
+                    os.remove(os.path.join(CLIPHIST_THUMBNAIL_DIRECTORY, name))
+                except OSError:
+                    pass
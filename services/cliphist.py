@@ -0,0 +1,404 @@
+import os
+import subprocess
+from collections.abc import Callable
+from typing import List
+
+from fabric.core.service import Service, Signal
+from fabric.utils import logger, monitor_file
+from gi.repository import Gio, GLib
+
+from utils.thread import thread
+
+# Items handed to the UI per main loop iteration while listing
+PAGE_SIZE = 50
+
+# Bytes peeked from `cliphist decode` to tell images from text
+SNIFF_SIZE = 16
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def cliphist_db_path() -> str:
+    """Location of the cliphist database, honouring CLIPHIST_DB_PATH."""
+    return os.environ.get("CLIPHIST_DB_PATH") or os.path.join(
+        GLib.get_user_cache_dir(), "cliphist", "db"
+    )
+
+
+def _sniff_image_type(header: bytes) -> str | None:
+    for magic, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(magic):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _run_command_async(
+    argv: List[str], callback: Callable[[bool], None], stdin: str | None = None
+):
+    """Run a command without blocking, `callback(success)` runs on the main loop."""
+    flags = Gio.SubprocessFlags.STDERR_SILENCE
+    if stdin is not None:
+        flags |= Gio.SubprocessFlags.STDIN_PIPE
+    try:
+        process = Gio.Subprocess.new(argv, flags)
+    except GLib.Error as e:
+        logger.error(f"[ClipHistory] Failed to run {argv[0]}: {e}")
+        GLib.idle_add(callback, False)
+        return
+
+    def on_finished(process, result):
+        try:
+            process.communicate_utf8_finish(result)
+        except GLib.Error as e:
+            logger.error(f"[ClipHistory] {' '.join(argv)} failed: {e}")
+            callback(False)
+            return
+        if not (success := process.get_successful()):
+            logger.error(f"[ClipHistory] {' '.join(argv)} exited with an error")
+        callback(success)
+
+    process.communicate_utf8_async(stdin, None, on_finished)
+
+
+def _db_mtime() -> int | None:
+    try:
+        return os.stat(cliphist_db_path()).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ClipItem:
+    """One line of `cliphist list`: an ID and a one-line preview."""
+
+    __slots__ = ("id", "content")
+
+    def __init__(self, item_id: str, content: str):
+        self.id = item_id
+        self.content = content
+
+    @classmethod
+    def from_line(cls, line: str) -> "ClipItem | None":
+        line = line.rstrip("\n")
+        if not line or "<meta http-equiv" in line:
+            return None
+        item_id, sep, content = line.partition("\t")
+        if not sep:
+            return None
+        return cls(item_id, content)
+
+
+class ClipHistory(Service):
+    """
+    Cached snapshot of the cliphist history.
+
+    `cliphist list` is streamed on a worker thread and handed to the main loop
+    in pages while it is read. The snapshot is keyed on the mtime of the
+    cliphist database, so it is only listed again after something else
+    changed the history. Deletes and wipes done through this service are
+    applied to the snapshot directly.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ClipHistory, cls).__new__(cls)
+        return cls._instance
+
+    @Signal
+    def reset(self) -> None:
+        """Signal emitted when the snapshot is emptied before a new listing."""
+
+    @Signal
+    def page_loaded(self, items: object) -> None:
+        """Signal emitted with each list of items read from cliphist."""
+
+    @Signal
+    def loaded(self) -> None:
+        """Signal emitted when a listing is complete."""
+
+    @Signal
+    def item_removed(self, item_id: str) -> None:
+        """Signal emitted when an item was deleted from the history."""
+
+    @Signal
+    def changed(self) -> None:
+        """Signal emitted when another program changed the history."""
+
+    @Signal
+    def wiped(self) -> None:
+        """Signal emitted when the whole history was cleared."""
+
+    def __init__(self, **kwargs):
+        if ClipHistory._initialized:
+            return
+        ClipHistory._initialized = True
+
+        super().__init__(**kwargs)
+
+        self._items: List[ClipItem] = []
+        self._mtime: int | None = None
+        self._loaded = False
+        # Bumped per listing so pages of an outdated listing are dropped
+        self._generation = 0
+        self._loading = False
+        # Set by the database monitor, our own deletes and wipes never set it
+        self._stale = False
+        self._own_changes = 0
+        # Database mtime from before our own deletes and wipes started
+        self._mtime_before: int | None = None
+
+        self._monitor = None
+        self._watch_database()
+
+    @property
+    def items(self) -> List[ClipItem]:
+        """Items read so far, newest first."""
+        return self._items
+
+    @property
+    def loading(self) -> bool:
+        return self._loading
+
+    def is_stale(self) -> bool:
+        if self._monitor is None:
+            return not self._loaded or _db_mtime() != self._mtime
+        return not self._loaded or self._stale
+
+    def refresh(self, force: bool = False) -> bool:
+        """List the history again if it changed, returns True if a listing started."""
+        if self._loading and not force:
+            return True
+        if not force and not self.is_stale():
+            return False
+
+        self._generation += 1
+        self._items = []
+        self._loaded = False
+        self._loading = True
+        self._stale = False
+        self.emit("reset")
+
+        # Taken before listing, a change while listing marks the result stale
+        thread(self._list, self._generation, _db_mtime())
+        return True
+
+    def delete(self, item_id: str):
+        """Delete one item from cliphist and from the snapshot."""
+
+        def on_done(success: bool):
+            if success:
+                self._on_deleted(item_id)
+            else:
+                self._end_own_change()
+                self._sync_mtime(adopt=False)
+
+        self._begin_own_change()
+        # cliphist reads the ID from the start of a list line on stdin
+        _run_command_async(["cliphist", "delete"], on_done, stdin=f"{item_id}\t")
+
+    def wipe(self):
+        """Clear the whole history."""
+
+        def on_done(success: bool):
+            if success:
+                self._on_wiped()
+            else:
+                self._end_own_change()
+                self._sync_mtime(adopt=False)
+
+        self._begin_own_change()
+        _run_command_async(["cliphist", "wipe"], on_done)
+
+    def paste(self, item_id: str, callback: Callable[[bool], None] | None = None):
+        """
+        Copy an item back to the clipboard.
+
+        `cliphist decode` is spliced straight into `wl-copy`, the payload never
+        passes through Python. The first bytes are peeked to tell images from
+        text, `callback` is called on the main loop with the outcome.
+        """
+
+        def done(success: bool):
+            if callback is not None:
+                callback(success)
+
+        try:
+            decode = Gio.Subprocess.new(
+                ["cliphist", "decode", item_id],
+                Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE,
+            )
+        except GLib.Error as e:
+            logger.error(f"[ClipHistory] Failed to decode {item_id}: {e}")
+            done(False)
+            return
+
+        source = Gio.BufferedInputStream.new(decode.get_stdout_pipe())
+
+        def on_filled(stream, result):
+            try:
+                stream.fill_finish(result)
+                mime_type = _sniff_image_type(bytes(stream.peek_buffer()))
+                copy = Gio.Subprocess.new(
+                    ["wl-copy", "--type", mime_type] if mime_type else ["wl-copy"],
+                    Gio.SubprocessFlags.STDIN_PIPE,
+                )
+            except GLib.Error as e:
+                logger.error(f"[ClipHistory] Failed to paste {item_id}: {e}")
+                decode.force_exit()
+                done(False)
+                return
+
+            copy.get_stdin_pipe().splice_async(
+                stream,
+                Gio.OutputStreamSpliceFlags.CLOSE_SOURCE
+                | Gio.OutputStreamSpliceFlags.CLOSE_TARGET,
+                GLib.PRIORITY_DEFAULT,
+                None,
+                lambda pipe, result: on_spliced(pipe, result, copy),
+            )
+
+        def on_spliced(pipe, result, copy):
+            try:
+                pipe.splice_finish(result)
+            except GLib.Error as e:
+                logger.error(f"[ClipHistory] Failed to paste {item_id}: {e}")
+                copy.force_exit()
+                done(False)
+                return
+            decode.wait_check_async(None, on_decoded)
+            copy.wait_check_async(None, on_copied)
+
+        def on_decoded(process, result):
+            try:
+                process.wait_check_finish(result)
+            except GLib.Error as e:
+                logger.warning(f"[ClipHistory] cliphist decode {item_id} failed: {e}")
+
+        def on_copied(process, result):
+            try:
+                done(process.wait_check_finish(result))
+            except GLib.Error as e:
+                logger.error(f"[ClipHistory] wl-copy failed: {e}")
+                done(False)
+
+        source.fill_async(SNIFF_SIZE, GLib.PRIORITY_DEFAULT, None, on_filled)
+
+    def _list(self, generation: int, mtime: int | None):
+        page: List[ClipItem] = []
+        try:
+            with subprocess.Popen(
+                ["cliphist", "list"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding="utf-8",
+                errors="replace",
+            ) as process:
+                for line in process.stdout:
+                    if (item := ClipItem.from_line(line)) is None:
+                        continue
+                    page.append(item)
+                    if len(page) >= PAGE_SIZE:
+                        GLib.idle_add(self._on_page, generation, page)
+                        page = []
+        except OSError as e:
+            logger.error(f"[ClipHistory] Failed to list history: {e}")
+
+        if page:
+            GLib.idle_add(self._on_page, generation, page)
+        GLib.idle_add(self._on_listed, generation, mtime)
+
+    def _on_page(self, generation: int, page: List[ClipItem]) -> bool:
+        if generation == self._generation:
+            self._items.extend(page)
+            self.emit("page-loaded", page)
+        return False
+
+    def _on_listed(self, generation: int, mtime: int | None) -> bool:
+        if generation == self._generation:
+            self._mtime = mtime
+            self._loaded = True
+            self._loading = False
+            self.emit("loaded")
+        return False
+
+    def _watch_database(self):
+        path = cliphist_db_path()
+        try:
+            self._monitor = monitor_file(path)
+        except GLib.Error as e:
+            logger.warning(f"[ClipHistory] Cannot watch {path}: {e}")
+            return
+        self._monitor.connect("changed", self._on_database_changed)
+
+    def _on_database_changed(self, _monitor, _file, _other_file, event):
+        if event not in (
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+            Gio.FileMonitorEvent.CREATED,
+            Gio.FileMonitorEvent.DELETED,
+        ):
+            return
+        if self._own_changes:
+            # Settled against the mtime from before once our command completes
+            return
+        if not self._loaded or self._stale:
+            return
+        if _db_mtime() == self._mtime:
+            return
+        self._stale = True
+        self.emit("changed")
+
+    def _begin_own_change(self):
+        if not self._own_changes:
+            self._mtime_before = _db_mtime()
+        self._own_changes += 1
+
+    def _end_own_change(self) -> bool:
+        self._own_changes = max(0, self._own_changes - 1)
+        return False
+
+    def _on_deleted(self, item_id: str) -> bool:
+        self._end_own_change()
+        self._items = [item for item in self._items if item.id != item_id]
+        self.emit("item-removed", item_id)
+        self._sync_mtime()
+        return False
+
+    def _on_wiped(self) -> bool:
+        self._end_own_change()
+        self._generation += 1
+        self._items = []
+        self._loading = False
+        self._loaded = True
+        # Changes from before the wipe are gone with it
+        self._mtime = self._mtime_before
+        self.emit("wiped")
+        self.emit("reset")
+        self.emit("loaded")
+        self._sync_mtime()
+        return False
+
+    def _sync_mtime(self, adopt: bool = True):
+        """
+        Settle the snapshot once our own deletes and wipes are done.
+
+        Their writes are already applied, so the mtime they left behind is
+        adopted without a listing. The database only counts as changed by
+        another program if it moved before they started, or if a failed
+        command left it moved.
+        """
+        if self._own_changes or not self._loaded:
+            return
+        mtime = _db_mtime()
+        if self._mtime_before == self._mtime and (adopt or mtime == self._mtime):
+            self._mtime = mtime
+        elif not self._stale:
+            self._stale = True
+            self.emit("changed")
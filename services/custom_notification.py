@@ -1,19 +1,40 @@
-import json
-import os
-from typing import List
+import time
+from collections import OrderedDict
+from typing import Dict, List
 
 from fabric import Signal
 from fabric.notifications import Notification, Notifications
 from fabric.utils import logger
+from gi.repository import GLib
+
+from services.notification_images import NotificationImages, is_stored_image
 
 from utils.constants import (
     NOTIFICATION_CACHE_FILE,
 )
-from utils.functions import write_json_file
+from utils.journal import Journal
+from utils.thread import run_in_pool
+
+# Journal records appended before the cache file is rewritten
+COMPACT_EVERY = 64
+
+# Keys of the serialized image, the pixel data is moved to a side file
+IMAGE_FILE_KEY = "image-file"
+IMAGE_PIXMAP_KEY = "image-pixmap"
 
 
 class CustomNotifications(Notifications):
-    """A service to manage the notifications."""
+    """
+    A service to manage the notifications.
+
+    Notifications are kept by ID, oldest first, and bucketed per app, so
+    adding, removing and evicting one is O(1). New notifications are
+    validated once when they are stored, cached ones when they are first
+    deserialized. The history is persisted as a snapshot plus a journal of
+    additions and removals, so caching a notification appends one line
+    instead of rewriting every stored notification. Images are stored as
+    pre-scaled side files, written in background.
+    """
 
     @Signal
     def clear_all(self, value: bool) -> None:
@@ -33,7 +54,12 @@ class CustomNotifications(Notifications):
     @property
     def count(self) -> int:
         """Return the count of notifications."""
-        return len(self.all_notifications)
+        return len(self._notifications)
+
+    @property
+    def all_notifications(self) -> List[dict]:
+        """Return the serialized notifications, oldest first."""
+        return list(self._notifications.values())
 
     @property
     def dont_disturb(self) -> bool:
@@ -48,140 +74,145 @@ class CustomNotifications(Notifications):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.all_notifications = []
+        self._notifications: Dict[int, dict] = {}
+        self._by_app: Dict[str, OrderedDict[int, dict]] = {}
         self._count = 0  # Will be updated to highest ID when loading
-        self.deserialized_notifications = []
+        # Deserialized on demand, by ID
+        self._deserialized: Dict[int, Notification] = {}
+        self.images = NotificationImages()
         self._dont_disturb = False
+        self._journal = Journal(
+            NOTIFICATION_CACHE_FILE,
+            snapshot_func=lambda: self.all_notifications,
+            compact_every=COMPACT_EVERY,
+        )
         self._load_notifications()
 
+    def _replay(self, notifications: List[dict], records: List) -> List[dict]:
+        """Apply journal records on top of the snapshot."""
+        by_id = {n.get("id", 0): n for n in notifications}
+        for record in records:
+            match record:
+                case ["add", notif]:
+                    by_id[notif.get("id", 0)] = notif
+                case ["remove", notif_id]:
+                    by_id.pop(notif_id, None)
+        # Oldest first, whatever order older cache files were written in
+        return sorted(by_id.values(), key=lambda n: n.get("id", 0))
+
+    def _store(self, notif: dict):
+        self._notifications[notif["id"]] = notif
+        self._by_app.setdefault(notif.get("app_name", ""), OrderedDict())[
+            notif["id"]
+        ] = notif
+
+    def _discard(self, notif_id: int) -> dict | None:
+        self._deserialized.pop(notif_id, None)
+        notif = self._notifications.pop(notif_id, None)
+        if notif is not None:
+            app_name = notif.get("app_name", "")
+            bucket = self._by_app[app_name]
+            del bucket[notif_id]
+            if not bucket:
+                del self._by_app[app_name]
+        return notif
+
+    def _write_add(self, notif: dict):
+        self._journal.append(["add", notif])
+
+    def _write_remove(self, notif_id: int):
+        self._journal.append(["remove", notif_id])
+
     def _load_notifications(self):
-        """Read notifications from the cache file."""
-        if os.path.exists(NOTIFICATION_CACHE_FILE):
-            try:
-                with open(NOTIFICATION_CACHE_FILE, "r") as file:
-                    notifications = json.load(file)
-
-                    notifications.reverse()
-
-                def validate_with_id(notif):
-                    """Helper to validate and return ID if valid."""
-                    try:
-                        self._deserialize_notification(notif)
-                        return (True, notif, notif.get("id", 0))
-                    except Exception as e:
-                        msg = f"[Notification] Invalid: {str(e)[:50]}"
-                        logger.exception(f"{msg}")
-                        return (False, None, 0)
-
-                # Validate all notifications at once
-                results = [validate_with_id(n) for n in notifications]
-
-                # Process results and find highest ID
-                valid_notifications = []
-                highest_id = self._count  # Start with current count
-                for is_valid, notif, notif_id in results:
-                    if is_valid:
-                        valid_notifications.append(notif)
-                        highest_id = max(highest_id, notif_id)
-
-                self.all_notifications = valid_notifications
-                self._count = highest_id  # Update to highest ID seen
-                write_json_file(self.all_notifications, NOTIFICATION_CACHE_FILE)
-                logger.info("[Notification] Notifications written successfully.")
-
-            except (json.JSONDecodeError, KeyError, ValueError, IndexError) as e:
-                logger.exception(f"[Notification] {e}")
-                self.all_notifications = []
-                self._count = 0
+        """Read notifications from the cache file and its journal."""
+        data, records = self._journal.load()
+        if data is None and not records:
+            return
+        try:
+            notifications = self._replay(data or [], records)
+        except (AttributeError, KeyError, ValueError, IndexError, TypeError) as e:
+            logger.exception(f"[Notification] {e}")
+            return
+
+        # Only the shape is checked, entries are deserialized on first access
+        valid_notifications = [
+            n for n in notifications if isinstance(n, dict) and "id" in n
+        ]
+        for notif in valid_notifications:
+            self._store(notif)
+        self._count = max((n["id"] for n in valid_notifications), default=self._count)
+        if records or len(valid_notifications) != len(notifications):
+            self._journal.compact(self.all_notifications)
+        self._move_inline_images()
 
     def remove_notification(self, id: int):
         """Remove the notification of given id."""
-        item = next((p for p in self.all_notifications if p["id"] == id), None)
-        if item:
-            self.all_notifications.remove(item)
-            write_json_file(self.all_notifications, NOTIFICATION_CACHE_FILE)
-            logger.info("[Notification] Notifications written successfully.")
+        if self._discard(id) is not None:
+            self._write_remove(id)
 
-            self.emit("notification_count", len(self.all_notifications))
+            self.emit("notification_count", self.count)
 
             # Emit clear_all signal if there are no notifications left
-            if len(self.all_notifications) == 0:
+            if not self._notifications:
                 self.emit("clear_all", True)
 
     def cache_notification(self, widget_config, data: Notification, max_count: int):
         """Cache the notification."""
-        # First clean up any invalid notifications
-        self._cleanup_invalid_notifications()
-
         # Get app-specific limit
         per_app_limits = widget_config.get("notification", {}).get("per_app_limits", {})
         app_limit = per_app_limits.get(data.app_name, max_count)
 
         # Create the new notification
-        self._count += 1
-        new_id = self._count
+        new_id = self._count + 1
         serialized_data = dict(data.serialize())
-        serialized_data.update({"id": new_id, "app_name": data.app_name})
-
-        # Get current notifications for this app and enforce limit
-        app_notifications = list(
-            [  # Make copy to avoid modification issues
-                n for n in self.all_notifications if n["app_name"] == data.app_name
-            ]
+        # The pixel data goes to a side file, journaled once it is written
+        serialized_data.update(
+            {"id": new_id, "app_name": data.app_name, IMAGE_PIXMAP_KEY: None}
         )
+        try:
+            # Validated once here, stored notifications are known to be valid
+            self._deserialize_notification(serialized_data)
+        except Exception as e:
+            logger.warning(f"[Notification] Not caching invalid: {str(e)[:50]}")
+            return
+        self._count = new_id
 
         # If we'll exceed the limit, remove oldest ones first
-        if len(app_notifications) >= app_limit:
-            # Sort by ID to get oldest first
-            app_notifications.sort(key=lambda x: x["id"])
-            # Remove enough to stay under limit
-            to_remove = len(app_notifications) - app_limit + 1
-            for old in app_notifications[:to_remove]:
-                self.all_notifications.remove(old)
-                self.emit("notification-closed", old["id"], "dismissed-by-limit")
+        app_notifications = self._by_app.get(data.app_name, {})
+        while app_notifications and len(app_notifications) >= app_limit:
+            old_id = next(iter(app_notifications))
+            self._discard(old_id)
+            self._write_remove(old_id)
+            self.emit("notification-closed", old_id, "dismissed-by-limit")
 
-        self.all_notifications.append(serialized_data)
+        self._store(serialized_data)
+        self.images.request(data, lambda path, _: self._on_image_stored(new_id, path))
 
         # Remove oldest notifications if total count exceeds max_count
-        while len(self.all_notifications) > max_count:
-            oldest = self.all_notifications.pop(0)
-            self.emit("notification-closed", oldest["id"], "dismissed-by-limit")
-
-        write_json_file(self.all_notifications, NOTIFICATION_CACHE_FILE)
-        self.emit("notification_count", len(self.all_notifications))
-
-    def _cleanup_invalid_notifications(self):
-        """Remove any invalid notifications."""
-
-        def validate_with_id(notif):
-            """Helper to validate and return result with ID."""
-            try:
-                self._deserialize_notification(notif)
-                return (True, notif, None)
-            except Exception as e:
-                msg = f"[Notification] Removing invalid: {str(e)[:50]}"
-                logger.debug(msg)
-                return (False, None, notif.get("id", 0))
-
-        # Validate all notifications at once
-        results = [validate_with_id(n) for n in self.all_notifications]
-
-        # Process results
-        valid_notifications = []
-        invalid_count = 0
-        for is_valid, notif, invalid_id in results:
-            if is_valid:
-                valid_notifications.append(notif)
-            else:
-                invalid_count += 1
-                self.emit("notification-closed", invalid_id, "dismissed-by-limit")
-
-        if invalid_count > 0:
-            self.all_notifications = valid_notifications
-            write_json_file(self.all_notifications, NOTIFICATION_CACHE_FILE)
-            logger.info("[Notification] Notifications written successfully.")
-
-            self.emit("notification_count", len(self.all_notifications))
+        while len(self._notifications) > max_count:
+            oldest_id = next(iter(self._notifications))
+            self._discard(oldest_id)
+            self._write_remove(oldest_id)
+            self.emit("notification-closed", oldest_id, "dismissed-by-limit")
+
+        self.emit("notification_count", self.count)
+
+    def _on_image_stored(self, notif_id: int, path: str | None):
+        if (notif := self._notifications.get(notif_id)) is None:
+            # Removed meanwhile, never journaled
+            return
+        if path is not None:
+            notif = self._replace(notif, {IMAGE_FILE_KEY: path})
+        self._write_add(notif)
+
+    def _replace(self, notif: dict, changes: dict) -> dict:
+        # Replaced, not mutated, a snapshot may be being written. Existing
+        # keys keep their position in both maps.
+        updated = {**notif, **changes}
+        self._notifications[notif["id"]] = updated
+        self._by_app[notif.get("app_name", "")][notif["id"]] = updated
+        self._deserialized.pop(notif["id"], None)
+        return updated
 
     def _deserialize_notification(self, notification):
         """Deserialize a notification."""
@@ -192,43 +223,71 @@ class CustomNotifications(Notifications):
         logger.info("[Notification] Clearing all notifications")
         # Clear notifications but preserve the highest ID we've seen
         highest_id = self._count
-        self.all_notifications = []
-        write_json_file(self.all_notifications, NOTIFICATION_CACHE_FILE)
-        logger.info("[Notification] Notifications written successfully.")
+        self._notifications.clear()
+        self._by_app.clear()
+        self._deserialized.clear()
+        run_in_pool(self.images.prune, [], time.time())
+        # Nothing older is worth replaying, the empty snapshot replaces the log
+        self._journal.compact([])
 
         self.emit("notification_count", 0)
         self.emit("clear_all", True)
         # Restore the ID counter so new notifications get unique IDs
         self._count = highest_id
 
+    def notification_ids(self) -> List[int]:
+        """Return the IDs of the cached notifications, oldest first."""
+        return list(self._notifications)
+
+    def get_notification(self, id: int) -> Notification | None:
+        """Deserialize one cached notification, e.g. when its row is shown."""
+        if (notification := self._deserialized.get(id)) is not None:
+            return notification
+        if (notif := self._notifications.get(id)) is None:
+            return None
+        try:
+            notification = self._deserialize_notification(notif)
+        except Exception as e:
+            logger.exception(f"[Notification] Deserialize failed: {str(e)[:50]}")
+            self.remove_notification(id)
+            return None
+        self._deserialized[id] = notification
+        return notification
+
     def get_deserialized(self) -> List[Notification]:
         """Return the notifications."""
-
-        def deserialize_with_id(notif):
-            """Helper to deserialize and return result with ID."""
-            try:
-                return (self._deserialize_notification(notif), None)
-            except Exception as e:
-                msg = f"[Notification] Deserialize failed: {str(e)[:50]}"
-                logger.exception(f"{msg}")
-                return (None, notif.get("id"))
-
-        # Process all notifications at once
-        results = [
-            deserialize_with_id(notification) for notification in self.all_notifications
+        return [
+            notification
+            for id in self.notification_ids()
+            if (notification := self.get_notification(id)) is not None
         ]
 
-        # Split into successful and failed
-        deserialized = []
-        invalid_ids = []
-        for result, error_id in results:
-            if result is not None:
-                deserialized.append(result)
-            elif error_id is not None:
-                invalid_ids.append(error_id)
-
-        # Clean up invalid notifications
-        for invalid_id in invalid_ids:
-            self.remove_notification(invalid_id)
+    def _move_inline_images(self):
+        """Move images of entries cached before side files to side files."""
+        inline = [n for n in self._notifications.values() if n.get(IMAGE_PIXMAP_KEY)]
+        referenced = [
+            n[IMAGE_FILE_KEY]
+            for n in self._notifications.values()
+            if is_stored_image(n.get(IMAGE_FILE_KEY))
+        ]
+        run_in_pool(self._store_inline_images, inline, referenced, time.time())
 
-        return deserialized
+    def _store_inline_images(self, inline: List[dict], referenced: List[str], before):
+        paths = {}
+        for notif in inline:
+            try:
+                notification = self._deserialize_notification(notif)
+            except Exception:
+                continue
+            if path := self.images.store_in_background(notification):
+                paths[notif["id"]] = path
+        self.images.prune([*referenced, *paths.values()], before)
+        if paths:
+            GLib.idle_add(self._on_inline_images_stored, paths)
+
+    def _on_inline_images_stored(self, paths: Dict[int, str]) -> bool:
+        for notif_id, path in paths.items():
+            if (notif := self._notifications.get(notif_id)) is not None:
+                self._replace(notif, {IMAGE_FILE_KEY: path, IMAGE_PIXMAP_KEY: None})
+        self._journal.compact(self.all_notifications)
+        return False
@@ -1,10 +1,11 @@
-from typing import Any, List, Literal
+from typing import Any, Dict, List, Literal, Tuple
 
 import gi
 from fabric.core.service import Property, Service, Signal
-from fabric.utils import bulk_connect, exec_shell_command_async
-from gi.repository import Gio
+from fabric.utils import bulk_connect, logger
+from gi.repository import Gio, GLib
 from typing import Callable
+from utils.coalesce import NotifyCoalescer
 from utils.exceptions import NetworkManagerNotFoundError
 
 try:
@@ -14,12 +15,132 @@ except ValueError:
     raise NetworkManagerNotFoundError()
 
 
+SIGNAL_ICONS = {
+    80: "network-wireless-signal-excellent-symbolic",
+    60: "network-wireless-signal-good-symbolic",
+    40: "network-wireless-signal-ok-symbolic",
+    20: "network-wireless-signal-weak-symbolic",
+    00: "network-wireless-signal-none-symbolic",
+}
+
+# Milliseconds NetworkManager updates are batched for, 0 batches them per
+# main loop iteration
+NOTIFY_INTERVAL = 0
+
+# Access point properties shown in network lists
+AP_PROPERTIES = ("ssid", "strength", "frequency")
+
+# callback(success, error message)
+ConnectCallback = Callable[[bool, str | None], None]
+# callback(success)
+ForgetCallback = Callable[[bool], None]
+
+
+def signal_icon_name(strength: int) -> str:
+    return SIGNAL_ICONS.get(
+        min(80, 20 * round(strength / 20)), "network-wireless-no-route-symbolic"
+    )
+
+
+def _decode_ssid(ap: NM.AccessPoint) -> str:
+    ssid = ap.get_ssid()
+    return NM.utils_ssid_to_utf8(ssid.get_data()) if ssid else "Unknown"
+
+
+# SSID and BSSIDs a saved profile is indexed under
+ProfileKeys = Tuple[str | None, Tuple[str, ...]]
+
+
+def _profile_keys(conn: NM.Connection) -> ProfileKeys:
+    """SSID and BSSIDs (pinned and seen) a saved profile is indexed under."""
+    settings = conn.get_setting_wireless()
+    if settings is None:
+        return None, ()
+    ssid = settings.get_ssid()
+    bssids = [settings.get_seen_bssid(i) for i in range(settings.get_num_seen_bssids())]
+    if pinned := settings.get_bssid():
+        bssids.append(pinned)
+    return (
+        NM.utils_ssid_to_utf8(ssid.get_data()) if ssid else None,
+        tuple(bssid.upper() for bssid in bssids),
+    )
+
+
+def _is_secured(ap: NM.AccessPoint) -> bool:
+    try:
+        security_none = getattr(NM, "80211ApSecurityFlags").NONE
+        # Check if network has any security flags
+        return bool(
+            ap.get_wpa_flags() != security_none or ap.get_rsn_flags() != security_none
+        )
+    except Exception:
+        return True
+
+
+def _key_management(ap: NM.AccessPoint) -> str:
+    """Key management a password connection to `ap` should use."""
+    flags = getattr(NM, "80211ApSecurityFlags")
+    rsn_flags = ap.get_rsn_flags()
+    # WPA3-only networks refuse PSK
+    if rsn_flags & flags.KEY_MGMT_SAE and not rsn_flags & flags.KEY_MGMT_PSK:
+        return "sae"
+    return "wpa-psk"
+
+
+def _reason_text(reason: int) -> str:
+    try:
+        return NM.ActiveConnectionStateReason(reason).value_nick
+    except ValueError:
+        return f"reason {reason}"
+
+
+def _watch_activation(active: NM.ActiveConnection, callback: ConnectCallback):
+    """Call `callback` once `active` is activated or has failed."""
+    state = active.get_state()
+    if state == NM.ActiveConnectionState.ACTIVATED:
+        callback(True, None)
+        return
+    if state == NM.ActiveConnectionState.DEACTIVATED:
+        callback(False, _reason_text(active.get_state_reason()))
+        return
+
+    def on_state_changed(active, state, reason):
+        if state == NM.ActiveConnectionState.ACTIVATED:
+            result = (True, None)
+        elif state == NM.ActiveConnectionState.DEACTIVATED:
+            result = (False, _reason_text(reason))
+        else:
+            return
+        active.disconnect(handler)
+        callback(*result)
+
+    handler = active.connect("state-changed", on_state_changed)
+
+
 class Wifi(Service):
-    """A service to manage wifi devices"""
+    """
+    A service to manage wifi devices
+
+    Access points are cached as records keyed by BSSID and kept up to date
+    from their own property notifications. Consumers get `ap-added`,
+    `ap-removed` and `ap-changed` deltas and only redraw the affected rows.
+    """
 
     @Signal
     def changed(self) -> None: ...
 
+    @Signal
+    def ap_added(self, record: object) -> None:
+        """Signal emitted with the record of an access point that appeared."""
+
+    @Signal
+    def ap_removed(self, bssid: str) -> None:
+        """Signal emitted with the BSSID of an access point that is gone."""
+
+    @Signal
+    def ap_changed(self, record: object) -> None:
+        """Signal emitted with the record of an access point that changed."""
+
     @Signal
     def enabled(self) -> bool: ...
 
@@ -32,7 +153,11 @@ class Wifi(Service):
         self._ap: NM.AccessPoint | None = None
         self._ap_signal: int | None = None
         self._is_scanning: bool = False
+        # BSSID -> access point record, and the AP with its signal handlers
+        self._ap_records: Dict[str, Dict[str, Any]] = {}
+        self._ap_handlers: Dict[str, Tuple[NM.AccessPoint, List[int]]] = {}
         super().__init__(**kwargs)
+        self._updates = NotifyCoalescer(self, NOTIFY_INTERVAL)
 
         self._client.connect(
             "notify::wireless-enabled",
@@ -43,26 +168,89 @@ class Wifi(Service):
                 self._device,
                 {
                     "notify::active-access-point": self._activate_ap,
-                    "access-point-added": lambda *args: self.emit("changed"),
-                    "access-point-removed": lambda *args: self.emit("changed"),
+                    "access-point-added": self._on_ap_added,
+                    "access-point-removed": self._on_ap_removed,
                     "state-changed": self.ap_update,
                 },
             )
+            for ap in self._device.get_access_points():
+                self._track_ap(ap)
             self._activate_ap()
 
+    def _make_ap_record(
+        self, ap: NM.AccessPoint, secured: bool | None = None
+    ) -> Dict[str, Any]:
+        strength = ap.get_strength()
+        return {
+            "bssid": ap.get_bssid(),
+            "ssid": _decode_ssid(ap),
+            "strength": strength,
+            "frequency": ap.get_frequency(),
+            # Security flags never change for a BSSID
+            "secured": _is_secured(ap) if secured is None else secured,
+            "icon-name": signal_icon_name(strength),
+        }
+
+    def _track_ap(self, ap: NM.AccessPoint) -> Dict[str, Any] | None:
+        bssid = ap.get_bssid()
+        if not bssid or bssid in self._ap_records:
+            return None
+        record = self._make_ap_record(ap)
+        self._ap_records[bssid] = record
+        self._ap_handlers[bssid] = (
+            ap,
+            [
+                ap.connect(f"notify::{name}", self._on_ap_property, bssid)
+                for name in AP_PROPERTIES
+            ],
+        )
+        return record
+
+    def _on_ap_added(self, _device, ap: NM.AccessPoint):
+        if (record := self._track_ap(ap)) is not None:
+            self.emit("ap-added", record)
+            self._updates.notify("access-points")
+            self._updates.emit("changed")
+
+    def _on_ap_removed(self, _device, ap: NM.AccessPoint):
+        bssid = ap.get_bssid()
+        if bssid not in self._ap_records:
+            return
+        del self._ap_records[bssid]
+        tracked, handlers = self._ap_handlers.pop(bssid)
+        for handler in handlers:
+            tracked.disconnect(handler)
+        self.emit("ap-removed", bssid)
+        self._updates.notify("access-points")
+        self._updates.emit("changed")
+
+    def _on_ap_property(self, ap: NM.AccessPoint, pspec, bssid: str):
+        record = self._ap_records.get(bssid)
+        if record is None:
+            return
+        updated = self._make_ap_record(ap, record["secured"])
+        if updated == record:
+            return
+        # Replaced, not mutated, so consumers can compare with what they drew
+        self._ap_records[bssid] = updated
+        self.emit("ap-changed", updated)
+
     def ap_update(self, *_):
-        self.emit("changed")
-        for sn in [
+        self._updates.notify(
             "enabled",
             "internet",
             "strength",
             "frequency",
-            "access-points",
             "ssid",
             "state",
             "icon-name",
-        ]:
-            self.notify(sn)
+        )
+        self._updates.emit("changed")
+
+    def _on_active_ap_strength(self, *_):
+        # Only the signal of the connected network moved
+        self._updates.notify("strength", "icon-name")
+        self._updates.emit("changed")
 
     def _activate_ap(self, *_):
         if self._ap:
@@ -72,9 +260,13 @@ class Wifi(Service):
             return
 
         self._ap_signal = self._ap.connect(
-            "notify::strength", lambda *args: self.ap_update()
+            "notify::strength", self._on_active_ap_strength
         )  # type: ignore
 
+    def get_access_point(self, bssid: str) -> NM.AccessPoint | None:
+        tracked = self._ap_handlers.get(bssid)
+        return tracked[0] if tracked else None
+
     def toggle_wifi(self):
         self._client.wireless_set_enabled(not self._client.wireless_get_enabled())
 
@@ -96,7 +288,7 @@ class Wifi(Service):
             pass
         self._is_scanning = False
         self.emit("scanning", False)
-        self.emit("changed")
+        self._updates.emit("changed")
 
     def disconnect_network(self):
         """Disconnect from the current WiFi network."""
@@ -112,12 +304,11 @@ class Wifi(Service):
             device.disconnect_finish(result)
         except Exception:
             pass
-        self.emit("changed")
+        self._updates.emit("changed")
 
     def notifier(self, name: str, *args):
-        self.notify(name)
-        self.emit("changed")
-        return
+        self._updates.notify(name)
+        self._updates.emit("changed")
 
     @Property(bool, "read-write", default_value=False)
     def enabled(self) -> bool:  # noqa: F811
@@ -137,16 +328,7 @@ class Wifi(Service):
             return "network-wireless-disabled-symbolic"
 
         if self.internet == "activated":
-            return {
-                80: "network-wireless-signal-excellent-symbolic",
-                60: "network-wireless-signal-good-symbolic",
-                40: "network-wireless-signal-ok-symbolic",
-                20: "network-wireless-signal-weak-symbolic",
-                00: "network-wireless-signal-none-symbolic",
-            }.get(
-                min(80, 20 * round(self._ap.get_strength() / 20)),
-                "network-wireless-no-route-symbolic",
-            )
+            return signal_icon_name(self._ap.get_strength())
         if self.internet == "activating":
             return "network-wireless-acquiring-symbolic"
 
@@ -174,52 +356,15 @@ class Wifi(Service):
 
     @Property(object, "readable")
     def access_points(self) -> List[object]:
-        points: list[NM.AccessPoint] = self._device.get_access_points()
-
-        def make_ap_dict(ap: NM.AccessPoint):
-            try:
-                wpa_flags = ap.get_wpa_flags()
-                rsn_flags = ap.get_rsn_flags()
-                security_none = getattr(NM, "80211ApSecurityFlags").NONE
-                # Check if network has any security flags
-                is_secured = bool(
-                    wpa_flags != security_none or rsn_flags != security_none
-                )
-            except Exception:
-                is_secured = True
-
-            return {
-                "bssid": ap.get_bssid(),
-                "last_seen": ap.get_last_seen(),
-                "ssid": (
-                    NM.utils_ssid_to_utf8(ap.get_ssid().get_data())
-                    if ap.get_ssid()
-                    else "Unknown"
-                ),
-                "active-ap": self._ap,
-                "strength": ap.get_strength(),
-                "frequency": ap.get_frequency(),
-                "secured": is_secured,
-                "icon-name": {
-                    80: "network-wireless-signal-excellent-symbolic",
-                    60: "network-wireless-signal-good-symbolic",
-                    40: "network-wireless-signal-ok-symbolic",
-                    20: "network-wireless-signal-weak-symbolic",
-                    00: "network-wireless-signal-none-symbolic",
-                }.get(
-                    min(80, 20 * round(ap.get_strength() / 20)),
-                    "network-wireless-no-route-symbolic",
-                ),
-            }
-
-        return list(map(make_ap_dict, points))
+        """Cached access point records, they must not be modified."""
+        return list(self._ap_records.values())
 
     @Property(str, "readable")
     def ssid(self):
         if not self._ap:
             return "Disconnected"
-        ssid = self._ap.get_ssid().get_data()
-        return NM.utils_ssid_to_utf8(ssid) if ssid else "Unknown"
+        record = self._ap_records.get(self._ap.get_bssid())
+        return record["ssid"] if record else _decode_ssid(self._ap)
 
     @Property(str, "readable")
     def state(self):
@@ -286,6 +431,7 @@ class Ethernet(Service):
         super().__init__(**kwargs)
         self._client: NM.Client = client
         self._device: NM.DeviceEthernet = device
+        self._updates = NotifyCoalescer(self, NOTIFY_INTERVAL)
 
         for names in (
             "active-connection",
@@ -294,13 +440,17 @@ class Ethernet(Service):
             "speed",
             "state",
         ):
-            self._device.connect(f"notify::{names}", lambda *_: self.notifier(names))
-
-        self._device.connect("notify::speed", lambda *_: print(_))
+            self._device.connect(
+                f"notify::{names}", lambda *_, names=names: self.notifier(names)
+            )
 
     def notifier(self, names):
-        self.notify(names)
-        self.emit("changed")
+        # The device changes several of these at once on every state change
+        if names in ("active-connection", "state"):
+            self._updates.notify("internet", "icon-name")
+        else:
+            self._updates.notify(names)
+        self._updates.emit("changed")
 
 
 class NetworkService(Service):
@@ -324,6 +474,11 @@ class NetworkService(Service):
         self._client: NM.Client | None = None
         self.wifi_device: Wifi | None = None
         self.ethernet_device: Ethernet | None = None
+        # Saved Wi-Fi profiles by SSID and by BSSID, each keyed by D-Bus path
+        self._saved_by_ssid: Dict[str, Dict[str, NM.RemoteConnection]] = {}
+        self._saved_by_bssid: Dict[str, Dict[str, NM.RemoteConnection]] = {}
+        # D-Bus path -> keys the profile is indexed under, "changed" handler
+        self._saved_keys: Dict[str, Tuple[ProfileKeys, int]] = {}
         super().__init__(**kwargs)
         NM.Client.new_async(
             cancellable=None,
@@ -332,6 +487,16 @@ class NetworkService(Service):
 
     def _init_network_client(self, client: NM.Client, task: Gio.Task, **kwargs):
         self._client = client
+        bulk_connect(
+            client,
+            {
+                "connection-added": lambda _, conn: self._index_connection(conn),
+                "connection-removed": lambda _, conn: self._unindex_connection(conn),
+            },
+        )
+        for conn in client.get_connections():
+            self._index_connection(conn)
+
         wifi_device: NM.DeviceWifi | None = self._get_device(NM.DeviceType.WIFI)  # type: ignore
         ethernet_device: NM.DeviceEthernet | None = self._get_device(
             NM.DeviceType.ETHERNET
@@ -371,19 +536,57 @@ class NetworkService(Service):
 
         return None
 
-    def connect_wifi_bssid(self, bssid: str):
-        """Connect to a WiFi network by BSSID (for saved/open networks)."""
-        exec_shell_command_async(
-            f"nmcli device wifi connect {bssid}",
-            lambda *args: None,
-        )
+    def _find_access_point(
+        self, bssid: str, callback: ConnectCallback | None
+    ) -> NM.AccessPoint | None:
+        ap = self.wifi_device.get_access_point(bssid) if self.wifi_device else None
+        if ap is None and callback:
+            callback(False, f"Access point {bssid} is not available")
+        return ap
+
+    def connect_wifi_bssid(self, bssid: str, callback: ConnectCallback | None = None):
+        """Connect to a WiFi network by BSSID (for saved/open networks).
+
+        Args:
+            bssid: The BSSID of the access point
+            callback: Optional callback(success: bool, error: str | None)
+        """
+        if (ap := self._find_access_point(bssid, callback)) is None:
+            return
+        device = self.wifi_device._device
+        # Compatibility is only checked against the few indexed candidates
+        saved = ap.filter_connections(self.get_saved_profiles(_decode_ssid(ap), bssid))
+
+        def on_activated(client: NM.Client, result: Gio.AsyncResult):
+            try:
+                if saved:
+                    active = client.activate_connection_finish(result)
+                else:
+                    active = client.add_and_activate_connection_finish(result)
+            except GLib.Error as e:
+                logger.error(f"[Network] Failed to connect to {bssid}: {e.message}")
+                if callback:
+                    callback(False, e.message)
+                return
+            if callback:
+                _watch_activation(active, callback)
+
+        if saved:
+            self._client.activate_connection_async(
+                saved[0], device, ap.get_path(), None, on_activated
+            )
+        else:
+            # NetworkManager completes a profile for open networks
+            self._client.add_and_activate_connection_async(
+                None, device, ap.get_path(), None, on_activated
+            )
 
     def connect_wifi_with_password(
         self,
         bssid: str,
         ssid: str,
         password: str,
-        callback: Callable[[bool, str | None], None] | None = None,
+        callback: ConnectCallback | None = None,
     ):
         """Connect to a WiFi network with a password.
 
@@ -393,66 +596,142 @@ class NetworkService(Service):
             password: The WiFi password
             callback: Optional callback(success: bool, error: str | None)
         """
-        # Escape special characters in password for shell
-        escaped_password = password.replace("'", "'\\''")
+        if (ap := self._find_access_point(bssid, callback)) is None:
+            return
 
-        command = f"nmcli device wifi connect '{bssid}' password '{escaped_password}'"
+        # Partial profile, NetworkManager fills in the rest from the AP
+        connection = NM.SimpleConnection.new()
+        setting = NM.SettingConnection.new()
+        setting.set_property(NM.SETTING_CONNECTION_ID, ssid)
+        connection.add_setting(setting)
+        security = NM.SettingWirelessSecurity.new()
+        security.set_property(
+            NM.SETTING_WIRELESS_SECURITY_KEY_MGMT, _key_management(ap)
+        )
+        security.set_property(NM.SETTING_WIRELESS_SECURITY_PSK, password)
+        connection.add_setting(security)
 
-        def on_complete(result: str, *args):
-            if callback:
-                # Check if connection was successful
-                if (
-                    "successfully activated" in result.lower()
-                    or "successfully" in result.lower()
-                ):
-                    callback(True, None)
-                else:
-                    callback(False, result if result else "Connection failed")
+        def on_added(client: NM.Client, result: Gio.AsyncResult):
+            try:
+                active = client.add_and_activate_connection_finish(result)
+            except GLib.Error as e:
+                logger.error(f"[Network] Failed to connect to {ssid}: {e.message}")
+                if callback:
+                    callback(False, e.message)
+                return
+
+            def on_result(success: bool, error: str | None):
+                # Don't keep a profile with a wrong password around
+                if not success and (profile := active.get_connection()) is not None:
+                    profile.delete_async(None, None)
+                if callback:
+                    callback(success, error)
+
+            _watch_activation(active, on_result)
+
+        self._client.add_and_activate_connection_async(
+            connection, self.wifi_device._device, ap.get_path(), None, on_added
+        )
 
-        exec_shell_command_async(command, on_complete)
+    def _index_connection(self, conn: NM.RemoteConnection):
+        path = conn.get_path()
+        if path in self._saved_keys:
+            return
+        keys = _profile_keys(conn)
+        if keys[0] is None:
+            # Not a Wi-Fi profile, only watched to be skipped cheaply
+            self._saved_keys[path] = (keys, 0)
+            return
+        handler = conn.connect("changed", self._on_connection_changed)
+        self._saved_keys[path] = (keys, handler)
+        self._add_keys(path, conn, keys)
+
+    def _unindex_connection(self, conn: NM.RemoteConnection):
+        path = conn.get_path()
+        if (entry := self._saved_keys.pop(path, None)) is None:
+            return
+        keys, handler = entry
+        if handler:
+            conn.disconnect(handler)
+        self._remove_keys(path, keys)
+
+    def _on_connection_changed(self, conn: NM.RemoteConnection):
+        path = conn.get_path()
+        if (entry := self._saved_keys.get(path)) is None:
+            return
+        old_keys, handler = entry
+        keys = _profile_keys(conn)
+        if keys == old_keys:
+            return
+        self._remove_keys(path, old_keys)
+        self._add_keys(path, conn, keys)
+        self._saved_keys[path] = (keys, handler)
+
+    def _add_keys(self, path: str, conn: NM.RemoteConnection, keys: ProfileKeys):
+        ssid, bssids = keys
+        if ssid is not None:
+            self._saved_by_ssid.setdefault(ssid, {})[path] = conn
+        for bssid in bssids:
+            self._saved_by_bssid.setdefault(bssid, {})[path] = conn
+
+    def _remove_keys(self, path: str, keys: ProfileKeys):
+        ssid, bssids = keys
+        entries = [(self._saved_by_bssid, bssid) for bssid in bssids]
+        if ssid is not None:
+            entries.append((self._saved_by_ssid, ssid))
+        for index, key in entries:
+            profiles = index.get(key)
+            if profiles is not None:
+                profiles.pop(path, None)
+                if not profiles:
+                    del index[key]
 
     def get_saved_connections(self) -> List[str]:
         """Get list of saved WiFi connection SSIDs."""
-        if not self._client:
-            return []
-
-        saved_ssids = []
-        connections = self._client.get_connections()
-
-        for conn in connections:
-            settings = conn.get_setting_wireless()
-            if settings:
-                ssid_bytes = settings.get_ssid()
-                if ssid_bytes:
-                    ssid = ssid_bytes.get_data().decode("utf-8", errors="ignore")
-                    saved_ssids.append(ssid)
-
-        return saved_ssids
+        return list(self._saved_by_ssid)
 
     def has_saved_connection(self, ssid: str) -> bool:
         """Check if a WiFi network has saved credentials."""
-        return ssid in self.get_saved_connections()
+        return ssid in self._saved_by_ssid
 
-    def forget_wifi_network(
-        self, ssid: str, callback: Callable[[bool], None] | None = None
-    ):
-        """Delete a saved WiFi connection profile.
+    def get_saved_profiles(
+        self, ssid: str | None = None, bssid: str | None = None
+    ) -> List[NM.RemoteConnection]:
+        """Saved profiles seen with a BSSID first, then those for an SSID."""
+        profiles = dict(self._saved_by_bssid.get(bssid.upper(), {})) if bssid else {}
+        if ssid:
+            profiles.update(self._saved_by_ssid.get(ssid, {}))
+        return list(profiles.values())
+
+    def forget_wifi_network(self, ssid: str, callback: ForgetCallback | None = None):
+        """Delete the saved connection profiles of a WiFi network.
 
         Args:
             ssid: The SSID of the network to forget
             callback: Optional callback(success: bool)
         """
-        escaped_ssid = ssid.replace("'", "'\\''")
-        command = f"nmcli connection delete '{escaped_ssid}'"
-
-        def on_complete(result: str, *args):
+        profiles = self.get_saved_profiles(ssid)
+        if not profiles:
             if callback:
-                callback(
-                    "successfully deleted" in result.lower()
-                    or "deleted" in result.lower()
-                )
+                callback(False)
+            return
 
-        exec_shell_command_async(command, on_complete)
+        pending = len(profiles)
+        failed = False
+
+        def on_deleted(conn: NM.RemoteConnection, result: Gio.AsyncResult):
+            nonlocal pending, failed
+            try:
+                conn.delete_finish(result)
+            except GLib.Error as e:
+                logger.error(f"[Network] Failed to forget {ssid}: {e.message}")
+                failed = True
+            pending -= 1
+            if pending == 0 and callback:
+                callback(not failed)
+
+        for conn in profiles:
+            conn.delete_async(None, on_deleted)
 
     @Property(str, "readable")
     def primary_device(self) -> str:
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections.abc import Callable
+from typing import Dict, Iterable, List, Tuple
+
+from fabric.notifications import Notification
+from fabric.utils import logger
+from gi.repository import GdkPixbuf, GLib
+
+from utils.constants import NOTIFICATION_IMAGE_DIRECTORY, NOTIFICATION_IMAGE_SIZE
+from utils.thread import run_in_pool
+
+# callback(side file path, thumbnail), both None without an image
+ImageCallback = Callable[[str | None, GdkPixbuf.Pixbuf | None], None]
+
+
+def _scale(pixbuf: GdkPixbuf.Pixbuf) -> GdkPixbuf.Pixbuf:
+    if (pixbuf.get_width(), pixbuf.get_height()) == (
+        NOTIFICATION_IMAGE_SIZE,
+        NOTIFICATION_IMAGE_SIZE,
+    ):
+        return pixbuf
+    return pixbuf.scale_simple(
+        NOTIFICATION_IMAGE_SIZE,
+        NOTIFICATION_IMAGE_SIZE,
+        GdkPixbuf.InterpType.BILINEAR,
+    )
+
+
+def _path_for(pixbuf: GdkPixbuf.Pixbuf) -> str:
+    # Hashes the thumbnail, not the full resolution image
+    digest = hashlib.sha1(pixbuf.read_pixel_bytes().get_data()).hexdigest()
+    return os.path.join(NOTIFICATION_IMAGE_DIRECTORY, f"{digest}.png")
+
+
+def is_stored_image(path: str | None) -> bool:
+    return bool(path) and os.path.dirname(path) == NOTIFICATION_IMAGE_DIRECTORY
+
+
+def _save(path: str, pixbuf: GdkPixbuf.Pixbuf):
+    if os.path.exists(path):
+        # Shared with a newer notification now, keep it out of `prune`
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return
+    try:
+        os.makedirs(NOTIFICATION_IMAGE_DIRECTORY, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        pixbuf.savev(tmp_path, "png", [], [])
+        os.replace(tmp_path, path)
+    except (OSError, GLib.Error) as e:
+        logger.warning(f"[NotificationImages] Failed to save {path}: {e}")
+
+
+def _load_image(notification: Notification) -> GdkPixbuf.Pixbuf | None:
+    try:
+        return notification.image_pixbuf
+    except GLib.Error:
+        logger.warning("[NotificationImages] Image not available.")
+        return None
+
+
+def _store_image(
+    notification: Notification,
+) -> Tuple[str | None, GdkPixbuf.Pixbuf | None]:
+    """Scale, hash and save the image of a notification, blocking."""
+    pixbuf = _load_image(notification)
+    if pixbuf is None:
+        return None, None
+    thumbnail = _scale(pixbuf)
+    path = _path_for(thumbnail)
+    _save(path, thumbnail)
+    return path, thumbnail
+
+
+class NotificationImages:
+    """
+    Notification images stored once as pre-scaled side files.
+
+    Images are scaled to `NOTIFICATION_IMAGE_SIZE` and hashed on the worker
+    pool, then written as PNGs named after the hash of the thumbnail, so the
+    cached history references a small file instead of carrying the pixel data
+    inline, and a burst sharing one avatar stores it once. A live
+    notification is processed once, however many callers ask for its image.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if NotificationImages._initialized:
+            return
+        NotificationImages._initialized = True
+
+        # Live notifications being processed and the callbacks waiting on them
+        self._requests: Dict[Notification, List[ImageCallback]] = {}
+        self._results: weakref.WeakKeyDictionary[
+            Notification, Tuple[str | None, GdkPixbuf.Pixbuf | None]
+        ] = weakref.WeakKeyDictionary()
+
+    def request(self, notification: Notification, callback: ImageCallback):
+        """
+        Store the image of a live notification once, in background.
+
+        `callback(path, thumbnail)` runs on the main loop, right away if the
+        image was already processed.
+        """
+        if (result := self._results.get(notification)) is not None:
+            callback(*result)
+            return
+        if (callbacks := self._requests.get(notification)) is not None:
+            callbacks.append(callback)
+            return
+        self._requests[notification] = [callback]
+        run_in_pool(self._process, notification)
+
+    def store_in_background(self, notification: Notification) -> str | None:
+        """Like `request`, for worker threads: blocking, nothing kept in memory."""
+        return _store_image(notification)[0]
+
+    def prune(self, referenced: Iterable[str], before: float):
+        """Delete side files older than `before` that are not referenced, blocking."""
+        keep = set(referenced)
+        try:
+            with os.scandir(NOTIFICATION_IMAGE_DIRECTORY) as it:
+                # Newer files may belong to notifications cached meanwhile
+                stale = [
+                    entry.path
+                    for entry in it
+                    if entry.path not in keep and entry.stat().st_mtime < before
+                ]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"[NotificationImages] Failed to scan images: {e}")
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _process(self, notification: Notification):
+        try:
+            path, thumbnail = _store_image(notification)
+        except Exception as e:
+            logger.warning(f"[NotificationImages] Failed to store image: {e}")
+            path, thumbnail = None, None
+        GLib.idle_add(self._finish, notification, path, thumbnail)
+
+    def _finish(
+        self,
+        notification: Notification,
+        path: str | None,
+        thumbnail: GdkPixbuf.Pixbuf | None,
+    ) -> bool:
+        self._results[notification] = (path, thumbnail)
+        for callback in self._requests.pop(notification, []):
+            callback(path, thumbnail)
+        return False
@@ -156,6 +156,7 @@ class Popover(Widget):
         self._content = content
         self._visible = False
         self._destroy_timeout = None
+        self._draw_handler = 0
 
         # Get singleton manager instance
         self._manager = PopoverManager()
@@ -261,7 +262,7 @@ class Popover(Widget):
         self._content_window = self._manager.get_popover_window()
 
         # Fix positioning for widgets that render asynchronously (e.g., Gtk.Calendar)
-        self._content.connect("draw", self._on_content_ready)
+        self._draw_handler = self._content.connect("draw", self._on_content_ready)
 
         # Add content to window
         self._content_window.add(
@@ -303,6 +304,14 @@ class Popover(Widget):
         self._destroy_timeout = None
         self._visible = False
 
+        # Detach the content so a factory may hand out the same widget again
+        if self._content is not None:
+            if self._draw_handler:
+                self._content.disconnect(self._draw_handler)
+                self._draw_handler = 0
+            if parent := self._content.get_parent():
+                parent.remove(self._content)
+
         if self._content_window:
             # Return window to the pool
             self._manager.return_popover_window(self._content_window)
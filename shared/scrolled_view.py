@@ -3,9 +3,10 @@ from fabric.widgets.box import Box
 from fabric.widgets.entry import Entry
 from fabric.widgets.scrolledwindow import ScrolledWindow
 from fabric.widgets.wayland import WaylandWindow as Window
-from fabric.utils import idle_add, remove_handler
 from gi.repository import Gtk, GtkLayerShell
 
+from shared.virtual_list import VirtualList
+
 
 # --- Click Interceptor Manager ---
 class ClickInterceptor:
@@ -81,7 +82,6 @@ class ScrolledView(Window):
 
         self.arrange_func = arrange_func
         self.add_item_func = add_item_func
-        self._arranger_handler: int = 0
 
         self.min_content_size = min_content_size
         self.set_size_request(560, 320)
@@ -101,18 +101,23 @@ class ScrolledView(Window):
             "notify::text", lambda entry, *_: self.arrange_viewport(entry.get_text())
         )
 
-        self.viewport = Box(spacing=2, orientation="v")
-        self.viewport.set_name("viewport")
-
         self.displayitems = ScrolledWindow(
             min_content_size=min_content_size,
             max_content_size=max_content_size,
-            child=self.viewport,
             h_scrollbar_policy=Gtk.PolicyType.NEVER,
             v_scrollbar_policy=Gtk.PolicyType.AUTOMATIC,
         )
         self.displayitems.set_name("displayitems")
 
+        # Only the visible rows are realized, widgets are built by add_item_func
+        self.viewport = VirtualList(
+            adjustment=self.displayitems.get_vadjustment(),
+            factory=self.add_item_func,
+            spacing=2,
+        )
+        self.viewport.set_name("viewport")
+        self.displayitems.add(self.viewport)
+
         self.scrolledwindow.add(self.search_entry)
         self.scrolledwindow.add(self.displayitems)
         self.add(self.scrolledwindow)
@@ -148,27 +153,5 @@ class ScrolledView(Window):
         return False
 
     def arrange_viewport(self, query: str = "") -> bool:
-        if self._arranger_handler:
-            remove_handler(self._arranger_handler)
-            self._arranger_handler = 0
-
-        for child in self.viewport.get_children():
-            self.viewport.remove(child)
-
-        filtered_iter = self.arrange_func(query)
-
-        self._arranger_handler = idle_add(
-            lambda *args: self.add_next_item(*args),
-            filtered_iter,
-            pin=True,
-        )
+        self.viewport.set_items([item for item in self.arrange_func(query) if item])
         return False
-
-    def add_next_item(self, items_iter: Iterator[Any]) -> bool:
-        item = next(items_iter, None)
-        if not item:
-            return False
-
-        widget = self.add_item_func(item)
-        self.viewport.add(widget)
-        return True
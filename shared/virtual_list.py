@@ -0,0 +1,182 @@
+import math
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from fabric.widgets.box import Box
+from gi.repository import GLib, Gtk
+
+
+class VirtualList(Box):
+    """
+    A vertical list that only realizes the rows inside the visible area.
+
+    A small pool of slot boxes covers the visible rows plus some overscan,
+    spacers stand in for everything above and below. On scroll or when the
+    items change the slots are rebound, widgets for items come from `factory`
+    and are kept in a bounded LRU cache, so an item that was shown before is
+    never rebuilt. Every slot is as tall as the tallest row measured so far,
+    which keeps the spacers exact for rows of varying height.
+    """
+
+    def __init__(
+        self,
+        adjustment: Gtk.Adjustment,
+        factory: Callable[[Any], Gtk.Widget],
+        row_height: int = 48,
+        spacing: int = 2,
+        overscan: int = 3,
+        cache_size: int = 128,
+        **kwargs,
+    ):
+        super().__init__(orientation="v", **kwargs)
+
+        self._adjustment = adjustment
+        self._factory = factory
+        self._row_height = row_height
+        self._spacing = spacing
+        self._overscan = overscan
+        self._cache_size = cache_size
+
+        self._items: Sequence[Any] = ()
+        self._slots: list[Box] = []
+        self._visible_count = 0
+        # item -> widget, most recently bound last
+        self._cache: OrderedDict[Any, Gtk.Widget] = OrderedDict()
+        # Widgets for unhashable items, destroyed as soon as they are unbound
+        self._transient: set[Gtk.Widget] = set()
+        self._measure_handler = 0
+        # The first measurement may shrink `row_height`, later ones only grow it
+        self._measured = False
+
+        self._top_spacer = Box()
+        self._rows = Box(orientation="v", spacing=spacing)
+        self._bottom_spacer = Box()
+        self.children = [self._top_spacer, self._rows, self._bottom_spacer]
+
+        self._adjustment.connect("value-changed", self._refresh)
+        self._adjustment.connect("notify::page-size", self._refresh)
+        self._rows.connect("size-allocate", self._on_rows_allocated)
+
+    @property
+    def items(self) -> Sequence[Any]:
+        return self._items
+
+    def set_items(self, items: Sequence[Any]):
+        """Replace the items and scroll back to the top."""
+        self._items = items
+        if self._adjustment.get_value() != 0:
+            # value-changed triggers the refresh
+            self._adjustment.set_value(0)
+        else:
+            self._refresh()
+
+    def clear_cache(self):
+        """Drop every cached row widget that is not currently bound."""
+        bound = {child for slot in self._slots for child in slot.get_children()}
+        for key, widget in list(self._cache.items()):
+            if widget not in bound:
+                del self._cache[key]
+                widget.destroy()
+
+    def _refresh(self, *_):
+        count = len(self._items)
+        stride = self._row_height + self._spacing
+        page_size = self._adjustment.get_page_size() or stride * 8
+
+        first = max(0, int(self._adjustment.get_value() // stride) - self._overscan)
+        last = min(count, first + math.ceil(page_size / stride) + 2 * self._overscan)
+        first = max(0, min(first, last - 1))
+        visible = max(0, last - first)
+
+        self._top_spacer.set_size_request(-1, first * stride)
+        self._bottom_spacer.set_size_request(-1, (count - last) * stride)
+
+        while len(self._slots) < visible:
+            slot = Box()
+            # show_all on an ancestor must not bring back unused slots
+            slot.set_no_show_all(True)
+            self._rows.add(slot)
+            self._slots.append(slot)
+
+        for offset, slot in enumerate(self._slots):
+            if offset < visible:
+                self._bind(slot, self._items[first + offset])
+                slot.set_size_request(-1, self._row_height)
+                slot.show()
+            else:
+                self._unbind(slot)
+                slot.hide()
+
+        self._visible_count = visible
+        return False
+
+    def _bind(self, slot: Box, item: Any):
+        widget = self._widget_for(item)
+        current = slot.get_children()
+        if current and current[0] is widget:
+            return
+
+        self._unbind(slot)
+        # The item may still sit in another slot from the previous layout
+        if parent := widget.get_parent():
+            parent.remove(widget)
+        slot.add(widget)
+        widget.show_all()
+
+    def _unbind(self, slot: Box):
+        for child in slot.get_children():
+            slot.remove(child)
+            if child in self._transient:
+                self._transient.discard(child)
+                child.destroy()
+
+    def _widget_for(self, item: Any) -> Gtk.Widget:
+        try:
+            widget = self._cache.pop(item)
+        except KeyError:
+            widget = self._factory(item)
+        except TypeError:
+            widget = self._factory(item)
+            self._transient.add(widget)
+            return widget
+
+        self._cache[item] = widget
+        self._evict()
+        return widget
+
+    def _evict(self):
+        excess = len(self._cache) - max(self._cache_size, len(self._slots))
+        if excess <= 0:
+            return
+        for key in list(self._cache)[:excess]:
+            widget = self._cache[key]
+            if widget.get_parent() is None:
+                del self._cache[key]
+                widget.destroy()
+
+    def _on_rows_allocated(self, _, allocation):
+        """Raise the row height to the tallest row GTK would lay out."""
+        if not self._visible_count or self._measure_handler:
+            return
+
+        tallest = max(
+            (
+                child.get_preferred_height_for_width(allocation.width)[1]
+                for slot in self._slots[: self._visible_count]
+                for child in slot.get_children()
+            ),
+            default=0,
+        )
+        if tallest <= 0 or (self._measured and tallest <= self._row_height):
+            return
+        self._measured = True
+        if tallest != self._row_height:
+            self._row_height = tallest
+            # Relayout outside of the allocation pass
+            self._measure_handler = GLib.idle_add(self._remeasure)
+
+    def _remeasure(self):
+        self._measure_handler = 0
+        self._refresh()
+        return False
@@ -199,3 +199,15 @@ def test_comma_handling(calc):
     result, cat = calc.calculate("1, 2")
     assert result == (1, 2)
     assert cat == "🧮 Math"
+
+
+def test_expression_safety(calc):
+    # Only whitelisted names evaluate, a bare function is not a result
+    assert calc.calculate("abs") is None
+    assert calc.calculate("(1)(2)") is None
+    # Runaway integer powers are rejected instead of hanging
+    assert calc.calculate("9^9^9") is None
+    assert calc.calculate("pow(9, 999999)") is None
+    assert calc.calculate("(9^9999)^9999") is None
+    assert calc.calculate("pow(pow(9, 9999), 9999)") is None
+    assert calc.calculate("2^10")[0] == 1024
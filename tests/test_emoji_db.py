@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from utils.emoji_db import EmojiDatabase, load_emoji_database
+
+EMOJIS = {
+    "😀": {"name": "grinning face", "slug": "grinning_face", "group": "Smileys"},
+    "🐱": {"name": "cat face", "slug": "cat_face", "group": "Animals & Nature"},
+    "🇹🇷": {"name": "flag: Türkiye", "slug": "flag_turkiye", "group": "Flags"},
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Fixture writing a small emoji JSON file."""
+    path = tmp_path / "emoji.json"
+    path.write_text(json.dumps(EMOJIS), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return str(tmp_path / "cache" / "emoji.bin")
+
+
+def test_columns_round_trip(source, cache):
+    database = load_emoji_database(source, cache)
+
+    assert len(database) == 3
+    assert list(database.chars) == list(EMOJIS)
+    assert database.names[2] == "flag: Türkiye"
+    assert database.group(1) == "Animals & Nature"
+    assert database.search_texts[0] == "grinning face grinning face smileys"
+
+
+def test_instances_share_the_mapping(source, cache):
+    assert load_emoji_database(source, cache) is load_emoji_database(source, cache)
+
+
+def test_rebuilt_when_source_changes(source, cache):
+    load_emoji_database(source, cache)
+
+    EMOJIS_V2 = {**EMOJIS, "🐶": {"name": "dog face", "group": "Animals & Nature"}}
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(EMOJIS_V2, f)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    database = load_emoji_database(source, cache)
+    assert len(database) == 4
+    assert database.chars[3] == "🐶"
+
+
+def test_rejects_corrupt_cache(source, cache):
+    os.makedirs(os.path.dirname(cache))
+    with open(cache, "wb") as f:
+        f.write(b"not an emoji cache")
+
+    with pytest.raises(ValueError):
+        EmojiDatabase(cache)
+    assert len(load_emoji_database(source, cache)) == 3
+
+
+def test_search_index(source, cache):
+    database = load_emoji_database(source, cache)
+
+    assert database.search_index.search("fa") == [0, 1]
+    assert database.search_index.search("face an") == [1]
+    assert database.search_index.search("türk") == [2]
+    assert database.positions["🐱"] == 1
@@ -0,0 +1,115 @@
+import pytest
+
+from utils.search import (
+    NarrowingFilter,
+    PrefixIndex,
+    SearchIndex,
+    prefix_edit_distance,
+)
+
+APPS = [
+    "Firefox",
+    "Google Chrome",
+    "GNU Image Manipulation Program",
+    "Files",
+    "Visual Studio Code",
+    "Calculator",
+    "Chromium",
+]
+
+
+@pytest.fixture
+def index():
+    """Fixture to build an index over plain application names."""
+    search = SearchIndex(name_func=lambda name: name)
+    search.rebuild(APPS)
+    return search
+
+
+def test_prefix_edit_distance():
+    assert prefix_edit_distance("chrom", "chromium") == 0
+    assert prefix_edit_distance("crhom", "chromium") == 2
+    assert prefix_edit_distance("chrme", "chrome") == 1
+    assert prefix_edit_distance("xyz", "chrome") == 2  # capped at limit + 1
+
+
+def test_empty_query_returns_everything_in_order(index):
+    assert index.search("") == APPS
+    assert index.search("  ", limit=2) == APPS[:2]
+
+
+def test_prefix_beats_substring(index):
+    # "Files" starts with the query, "Firefox" and "Visual Studio Code" do not
+    assert index.search("fi")[0] == "Files"
+    assert index.search("chrom") == ["Chromium", "Google Chrome"]
+
+
+def test_acronym(index):
+    assert index.search("gc")[0] == "Google Chrome"
+    assert index.search("vsc") == ["Visual Studio Code"]
+
+
+def test_typo_tolerance(index):
+    assert "Calculator" in index.search("calulator")
+    assert index.search("firefx") == ["Firefox"]
+    # Short queries never fall back to fuzzy matching
+    assert index.search("fxr") == []
+
+
+def test_narrowing_matches_fresh_search(index):
+    narrowed = [index.search(query) for query in ("c", "ch", "chr", "chro")]
+
+    fresh = SearchIndex(name_func=lambda name: name)
+    fresh.rebuild(APPS)
+    assert narrowed[-1] == fresh.search("chro")
+
+
+def test_limit_and_frequency_bonus():
+    launches = {}
+    search = SearchIndex(
+        name_func=lambda name: name, score_func=lambda name: launches.get(name, 0)
+    )
+    search.rebuild(APPS)
+
+    # Same tier, the shorter name wins until usage says otherwise
+    assert search.search("fi", limit=1) == ["Files"]
+    launches["Firefox"] = 5
+    assert search.search("fi", limit=1) == ["Firefox"]
+
+    # Usage never lifts a word-start match above a prefix match
+    launches["Google Chrome"] = 1000
+    assert search.search("chrom") == ["Chromium", "Google Chrome"]
+
+
+def test_narrowing_filter_tracks_changes():
+    lines = ["Hello World", "hello there", "Goodbye"]
+    search = NarrowingFilter(text_func=lambda line: line)
+    search.set_items(lines)
+
+    assert search.filter("HELLO") == ["Hello World", "hello there"]
+    assert search.filter("hello t") == ["hello there"]
+
+    # Items appended or removed while narrowing keep the result current
+    search.extend(["say hello to them"])
+    assert search.filter("hello th") == ["hello there"]
+    assert search.filter("hello t") == ["hello there", "say hello to them"]
+    search.remove("hello there")
+    assert search.filter("hello to") == ["say hello to them"]
+
+    assert search.filter("") == ["Hello World", "Goodbye", "say hello to them"]
+
+
+def test_prefix_index():
+    texts = ["grinning face", "cat face", "grinning cat with smiling eyes", "dog"]
+    index = PrefixIndex(texts)
+
+    assert index.search("") is None
+    assert index.search("fa") == [0, 1]
+    assert index.search("gr c") == [2]
+    # Words have to start a word, not just occur in it
+    assert index.search("ace") == []
+
+    # Narrowing as the query grows gives the same result as a fresh lookup
+    for query in ("c", "ca", "cat", "cat f", "cat fa"):
+        narrowed = index.search(query)
+    assert narrowed == PrefixIndex(texts).search("cat fa") == [1]
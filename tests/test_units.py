@@ -0,0 +1,100 @@
+import json
+import time
+
+import pytest
+
+import modules.units as units
+from modules.units import CATEGORIES, UNITS, UnitConverter
+
+
+@pytest.fixture
+def converter():
+    """Fixture for a converter without currency rates."""
+    return UnitConverter()
+
+
+@pytest.fixture
+def rates(tmp_path):
+    """Fixture writing a local currency rates file."""
+    path = tmp_path / "currency_rates.json"
+    path.write_text(json.dumps({"base": "EUR", "rates": {"USD": 2, "TRY": 40}}))
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("1 km to m", ("1000.00 m", "length")),
+        ("12 in to cm", ("30.48 cm", "length")),
+        ("1 mile in km", ("1.61 km", "length")),
+        ("1 gib to mb", ("1073.74 MB", "data")),
+        ("8 bit to b", ("1.00 B", "data")),
+        ("90 min to h", ("1.50 h", "time")),
+        ("2 days to hr", ("48.00 hr", "time")),
+        ("100 km/h to m/s", ("27.78 m/s", "speed")),
+        ("0 c to kelvin", ("273.15K", "temperature")),
+        ("1 cup to floz", ("8.00 fl oz", "volume")),
+    ],
+)
+def test_dimensions(converter, query, expected):
+    assert converter.convert(query) == expected
+
+
+def test_rejects_mismatched_dimensions(converter):
+    assert converter.convert("1 kg to m") is None
+    assert converter.convert("1 parsec to m") is None
+    # Lengths have no implicit counterpart
+    assert converter.convert("5 m") is None
+    assert converter.convert("-5 kg to g") is None
+
+
+def test_currency_from_local_file(rates):
+    converter = UnitConverter(currency_file=rates)
+
+    assert converter.convert("10 usd to try") == ("200.00 TRY", "currency")
+    assert converter.convert("3 eur in usd") == ("6.00 USD", "currency")
+    # Physical units win over currency codes
+    assert converter.convert("1 cup to ml") == ("236.59 ml", "volume")
+
+
+def test_missing_currency_file(tmp_path):
+    converter = UnitConverter(currency_file=str(tmp_path / "missing.json"))
+    assert converter.convert("1 usd to eur") is None
+
+
+def test_every_dimension_has_a_category():
+    assert {unit.dimension for unit in UNITS.values()} <= set(CATEGORIES)
+
+
+class _CountingPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.calls = 0
+
+    def match(self, string):
+        self.calls += 1
+        return self.pattern.match(string)
+
+
+def test_benchmark_single_pass(converter, monkeypatch):
+    queries = [
+        "100c",
+        "1kg to lbs",
+        "1 gallon to l",
+        "5 km to mi",
+        "2 gb to mib",
+        "3 hours to min",
+        "60 mph to km/h",
+    ] * 500
+    pattern = _CountingPattern(units._QUERY)
+    monkeypatch.setattr(units, "_QUERY", pattern)
+
+    start = time.perf_counter()
+    for query in queries:
+        assert converter.convert(query) is not None
+    elapsed = time.perf_counter() - start
+
+    # Every dimension is resolved by one tokenizer pass and table lookups
+    assert pattern.calls == len(queries)
+    # Generous bound, a conversion takes a few microseconds
+    assert elapsed / len(queries) < 1e-3
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from utils.journal import Journal
+from utils.usage import HALF_LIFE, UsageTracker
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Fixture for a snapshot path inside a scratch directory."""
+    return str(tmp_path / "usage" / "launcher.json")
+
+
+def test_journal_replays_records_after_snapshot(path):
+    journal = Journal(path)
+    journal.load()
+    journal.append("a")
+    journal.compact(["a"])
+    journal.append("b")
+    journal.flush()
+
+    data, records = Journal(path).load()
+    assert data == ["a"]
+    assert records == ["b"]
+
+
+def test_journal_skips_torn_lines(path):
+    journal = Journal(path)
+    journal.load()
+    journal.append({"id": 1})
+    journal.flush()
+    with open(journal.log_path, "a", encoding="utf-8") as f:
+        f.write('[2, {"id"')
+
+    assert Journal(path).load() == (None, [{"id": 1}])
+
+
+def test_journal_reads_plain_snapshot(path, tmp_path):
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(json.dumps([{"id": 1}]))
+
+    assert Journal(str(legacy)).load() == ([{"id": 1}], [])
+
+
+def test_frecency_decays(path):
+    usage = UsageTracker("launcher", path=path)
+    usage.record("firefox.desktop", timestamp=0)
+    usage.record("firefox.desktop", timestamp=0)
+
+    assert usage.score("firefox.desktop", now=0) == pytest.approx(2)
+    assert usage.score("firefox.desktop", now=HALF_LIFE) == pytest.approx(1)
+    assert usage.score("unknown.desktop") == 0
+
+
+def test_recent_beats_old_frequent(path):
+    usage = UsageTracker("launcher", path=path)
+    for _ in range(3):
+        usage.record("old.desktop", timestamp=0)
+    usage.record("new.desktop", timestamp=3 * HALF_LIFE)
+
+    now = 3 * HALF_LIFE
+    assert usage.score("new.desktop", now=now) > usage.score("old.desktop", now=now)
+
+
+def test_usage_persists_through_compaction(path):
+    usage = UsageTracker("launcher", path=path)
+    usage._journal.compact_every = 3
+    for timestamp in range(5):
+        usage.record("files.desktop", timestamp=timestamp)
+    usage.flush()
+
+    reloaded = UsageTracker("launcher", path=path)
+    assert reloaded.score("files.desktop", now=4) == pytest.approx(
+        usage.score("files.desktop", now=4)
+    )
+    # Compacted records are gone from the log
+    with open(f"{path}.journal", encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
@@ -0,0 +1,79 @@
+from typing import Dict
+
+from gi.repository import GLib, GObject
+
+
+class NotifyCoalescer:
+    """
+    Batches property notifications and argument-less signals of a GObject.
+
+    Names queued while a batch is pending are merged, so a property notified
+    ten times by one NetworkManager update reaches listeners once. With an
+    interval of 0 the batch is flushed at the end of the current main loop
+    iteration, before GTK redraws; otherwise it is flushed after `interval`
+    milliseconds, which bounds how often listeners run.
+    """
+
+    def __init__(self, target: GObject.Object, interval: int = 0):
+        self._target = target
+        self._interval = interval
+        # Dicts keep the order names were first queued in
+        self._properties: Dict[str, None] = {}
+        self._signals: Dict[str, None] = {}
+        self._source_id: int | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._source_id is not None
+
+    def notify(self, *names: str):
+        """Queue a notify for every property in `names`."""
+        self._properties.update(dict.fromkeys(names))
+        self._schedule()
+
+    def emit(self, *signals: str):
+        """Queue an emission of every signal in `signals`, they take no arguments."""
+        self._signals.update(dict.fromkeys(signals))
+        self._schedule()
+
+    def flush(self):
+        """Deliver everything queued now."""
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+        self._on_flush()
+
+    def cancel(self):
+        """Drop everything queued."""
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+        self._properties.clear()
+        self._signals.clear()
+
+    def _schedule(self):
+        if self._source_id is not None:
+            return
+        if self._interval > 0:
+            self._source_id = GLib.timeout_add(self._interval, self._on_flush)
+        else:
+            # Ahead of GTK's redraw so a frame never shows half an update
+            self._source_id = GLib.idle_add(
+                self._on_flush, priority=GLib.PRIORITY_HIGH_IDLE
+            )
+
+    def _on_flush(self) -> bool:
+        self._source_id = None
+        properties, self._properties = self._properties, {}
+        signals, self._signals = self._signals, {}
+
+        # Properties first, so "changed" listeners read settled values
+        if properties:
+            self._target.freeze_notify()
+            try:
+                for name in properties:
+                    self._target.notify(name)
+            finally:
+                self._target.thaw_notify()
+        for signal in signals:
+            self._target.emit(signal)
+        return False
@@ -7,6 +7,12 @@ APP_CACHE_DIRECTORY = f"{SYSTEM_CACHE_DIR}/{APPLICATION_NAME}"
 
 
 NOTIFICATION_CACHE_FILE = f"{APP_CACHE_DIRECTORY}/notifications.json"
+NOTIFICATION_IMAGE_DIRECTORY = f"{APP_CACHE_DIRECTORY}/notification-images"
+APP_INDEX_CACHE_FILE = f"{APP_CACHE_DIRECTORY}/app_index.json"
+USAGE_DIRECTORY = f"{APP_CACHE_DIRECTORY}/usage"
+CLIPHIST_THUMBNAIL_DIRECTORY = f"{APP_CACHE_DIRECTORY}/cliphist-thumbnails"
+EMOJI_CACHE_FILE = f"{APP_CACHE_DIRECTORY}/emoji.bin"
+CURRENCY_RATES_FILE = f"{APP_CACHE_DIRECTORY}/currency_rates.json"
 
 ASSETS_DIR = get_relative_path("../assets/")
 
@@ -135,6 +141,7 @@ DEFAULT_CONFIG = {
         "ignored": [],
         "timeout": 3000,
         "max_count": 200,
+        "max_popups": 3,
         "transition_type": "slide-left",
         "transition_duration": 350,
         "per_app_limits": {},
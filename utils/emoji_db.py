@@ -0,0 +1,222 @@
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Tuple
+
+from utils.search import PrefixIndex
+
+# Bump whenever the layout below changes so old caches are rebuilt
+FORMAT_VERSION = 1
+
+MAGIC = b"LNEM"
+
+# magic, version, byte order, source mtime_ns, source size, emoji count,
+# group count
+_HEADER = struct.Struct("<4sIBxxxqqII")
+_LENGTH = struct.Struct("<I")
+
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+
+def _pad(data: bytes) -> bytes:
+    # Keeps every column 4-byte aligned for memoryview.cast
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _string_column(strings: List[str]) -> Tuple[bytes, bytes]:
+    """Concatenated UTF-8 blob and the u32 offset of every string in it."""
+    offsets = array("I", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets.tobytes(), bytes(blob)
+
+
+def search_text(name: str, slug: str, group: str) -> str:
+    """Casefolded text the picker matches queries against."""
+    return f"{name} {slug.replace('_', ' ')} {group}".casefold()
+
+
+def compile_emoji_database(source: str, target: str):
+    """Compile the emoji JSON at `source` into the binary cache at `target`."""
+    stat = os.stat(source)
+    with open(source, "r", encoding="utf-8") as f:
+        emojis: Dict[str, Dict] = json.load(f)
+
+    chars, names, texts, group_ids = [], [], [], array("H")
+    groups: Dict[str, int] = {}
+    for char, info in emojis.items():
+        name = info.get("name", "")
+        group = info.get("group", "")
+        chars.append(char)
+        names.append(name)
+        texts.append(search_text(name, info.get("slug", ""), group))
+        group_ids.append(groups.setdefault(group, len(groups)))
+
+    columns = [
+        *_string_column(chars),
+        *_string_column(names),
+        *_string_column(texts),
+        group_ids.tobytes(),
+        *_string_column(list(groups)),
+    ]
+
+    data = bytearray(
+        _HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            _BYTE_ORDER,
+            stat.st_mtime_ns,
+            stat.st_size,
+            len(chars),
+            len(groups),
+        )
+    )
+    for column in columns:
+        data += _LENGTH.pack(len(column))
+        data += _pad(column)
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+
+
+class _StringColumn:
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._blob[start:end], "utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+class EmojiDatabase:
+    """
+    Read-only, memory-mapped view of a compiled emoji cache.
+
+    Every column is a blob plus an offset table, strings are only decoded when
+    they are accessed, so opening the database costs a handful of slices.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._parse(memoryview(self._map), path)
+        except (struct.error, TypeError) as e:
+            raise ValueError(f"{path} is corrupt") from e
+
+    def _parse(self, view: memoryview, path: str):
+        (
+            magic,
+            version,
+            byte_order,
+            self.source_mtime,
+            self.source_size,
+            self._count,
+            group_count,
+        ) = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            raise ValueError(f"{path} is not a compatible emoji cache")
+
+        columns = []
+        offset = _HEADER.size
+        for _ in range(9):
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            columns.append(view[offset : offset + length])
+            offset += length + (-length % 4)
+
+        (
+            chars,
+            char_blob,
+            names,
+            name_blob,
+            texts,
+            text_blob,
+            group_ids,
+            group_offsets,
+            group_blob,
+        ) = columns
+
+        self.chars = _StringColumn(chars.cast("I"), char_blob)
+        self.names = _StringColumn(names.cast("I"), name_blob)
+        self.search_texts = _StringColumn(texts.cast("I"), text_blob)
+        self.group_ids = group_ids.cast("H")
+        self.groups = list(_StringColumn(group_offsets.cast("I"), group_blob))
+
+        if len(self.chars) != self._count or len(self.groups) != group_count:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def group(self, index: int) -> str:
+        return self.groups[self.group_ids[index]]
+
+    @functools.cached_property
+    def search_index(self) -> PrefixIndex:
+        """Word prefix index over the search texts, built on first use."""
+        return PrefixIndex([self.search_texts[i] for i in range(self._count)])
+
+    @functools.cached_property
+    def positions(self) -> Dict[str, int]:
+        """Position of every emoji by its character."""
+        return {self.chars[i]: i for i in range(self._count)}
+
+    def is_current(self, source: str) -> bool:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            # Keep serving the cache if the source went away
+            return True
+        return (stat.st_mtime_ns, stat.st_size) == (
+            self.source_mtime,
+            self.source_size,
+        )
+
+
+_databases: Dict[Tuple[str, str], EmojiDatabase] = {}
+
+
+def load_emoji_database(source: str, cache: str) -> EmojiDatabase:
+    """
+    Open the compiled cache of `source`, rebuilding it when it is outdated.
+
+    The mapping is shared by every caller asking for the same files.
+    """
+    key = (source, cache)
+    database = _databases.get(key)
+    if database is not None and database.is_current(source):
+        return database
+
+    try:
+        database = EmojiDatabase(cache)
+    except OSError:
+        database = None
+    except ValueError:
+        database = None
+
+    if database is not None and not database.is_current(source):
+        database = None
+
+    if database is None:
+        compile_emoji_database(source, cache)
+        database = EmojiDatabase(cache)
+
+    _databases[key] = database
+    return database
@@ -1,7 +1,11 @@
+import functools
 import json
-import subprocess
+from collections.abc import Callable
 from typing import Iterator, List, Tuple
 
+from fabric.hyprland.widgets import get_hyprland_connection
+from fabric.utils import logger
+
 modmask_map = {
     64: "SUPER",
     8: "ALT",
@@ -10,6 +14,7 @@ modmask_map = {
 }
 
 
+@functools.lru_cache(maxsize=64)
 def modmask_to_key(modmask: int) -> str:
     keys = [key for bf, key in modmask_map.items() if (modmask & bf) == bf]
     known_bits = sum(bf for bf in modmask_map.keys())
@@ -19,34 +24,88 @@ def modmask_to_key(modmask: int) -> str:
     return " + ".join(keys)
 
 
+def format_keybind(bind: dict) -> Tuple[str, str, str]:
+    """Key combo, description and command of one `binds` entry."""
+    modifiers = modmask_to_key(bind["modmask"])
+    return (
+        (f"{modifiers} + {bind['key']}:" if modifiers else f"{bind['key']}:").strip(),
+        bind.get("description", "").strip(),
+        f"{bind.get('dispatcher', '').strip()}: {bind.get('arg', '').strip()}".strip(
+            ": "
+        ),
+    )
+
+
 class KeybindLoader:
+    """
+    Cached catalog of the Hyprland keybinds.
+
+    The binds are requested over the Hyprland socket without blocking and kept
+    until Hyprland reports a config reload, every entry stores its casefolded
+    search text so filtering is a substring check per bind.
+    """
+
     def __init__(self):
         self.keybinds: List[Tuple[str, str, str]] = []
+        self._search_keys: List[str] = []
+        self._valid = False
+        self._loading = False
+        # Bumped on invalidation, replies to older requests are outdated
+        self._generation = 0
+        self._callbacks: List[Callable[[], None]] = []
 
-    def load_keybinds(self) -> None:
-        try:
-            output = subprocess.check_output(["hyprctl", "binds", "-j"], text=True)
-            binds = json.loads(output)
-        except Exception as e:
-            print(f"ERROR: Failed to load keybinds from hyprctl: {e}")
-            self.keybinds = []
+        self._connection = get_hyprland_connection()
+        self._connection.connect("event::configreloaded", self._on_config_reloaded)
+
+    def load_keybinds(self, callback: Callable[[], None] | None = None) -> None:
+        """Fetch the binds unless cached, `callback` runs once they changed."""
+        if self._valid:
+            return
+        if callback is not None:
+            self._callbacks.append(callback)
+        if self._loading:
             return
 
-        self.keybinds = [
-            (
-                (
-                    f"{modmask_to_key(bind['modmask'])} + {bind['key']}:"
-                    if modmask_to_key(bind["modmask"])
-                    else f"{bind['key']}:"
-                ).strip(),
-                bind.get("description", "").strip(),
-                f"{bind.get('dispatcher', '').strip()}: {bind.get('arg', '').strip()}".strip(
-                    ": "
-                ),
-            )
-            for bind in binds
-        ]
+        self._loading = True
+        generation = self._generation
+        self._connection.send_command_async(
+            "j/binds", lambda reply: self._on_reply(reply, generation)
+        )
+
+    def invalidate(self) -> None:
+        self._valid = False
+        self._generation += 1
 
     def filter_keybinds(self, query: str = "") -> Iterator[Tuple[str, str, str]]:
         query_cf = query.casefold()
-        return (kb for kb in self.keybinds if query_cf in " ".join(kb).casefold())
+        if not query_cf:
+            return iter(self.keybinds)
+        return (
+            kb for kb, key in zip(self.keybinds, self._search_keys) if query_cf in key
+        )
+
+    def _on_reply(self, reply, generation: int) -> None:
+        self._loading = False
+        if generation != self._generation:
+            # The config was reloaded while this request was in flight
+            self.load_keybinds()
+            return
+
+        try:
+            binds = json.loads(reply.reply.decode())
+            keybinds = [format_keybind(bind) for bind in binds]
+        except (AttributeError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"[Keybinds] Failed to load keybinds from Hyprland: {e}")
+            keybinds = []
+        else:
+            self._valid = True
+
+        self.keybinds = keybinds
+        self._search_keys = [" ".join(kb).casefold() for kb in keybinds]
+
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _on_config_reloaded(self, *_) -> None:
+        self.invalidate()
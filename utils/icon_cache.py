@@ -0,0 +1,160 @@
+import os
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+
+from fabric.utils import logger
+from gi.repository import GdkPixbuf, GLib, Gtk
+
+from utils.thread import run_in_pool
+
+# Decoded RGBA pixbufs kept in memory, 16 MiB is ~1000 icons at 64px
+ICON_CACHE_BUDGET = 16 * 1024 * 1024
+
+DEFAULT_ICON = "application-x-executable"
+
+IconKey = tuple[str, int, int]
+IconCallback = Callable[[GdkPixbuf.Pixbuf | None], None]
+
+
+class IconCache:
+    """
+    Shared cache of decoded icons keyed by (icon name or path, size, scale).
+
+    The icon theme is only consulted on the main thread, decoding and scaling
+    run on the worker pool. Least recently used pixbufs are evicted once the
+    byte budget is exceeded, and the cache is dropped when the theme changes.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, budget: int = ICON_CACHE_BUDGET):
+        if IconCache._initialized:
+            return
+        IconCache._initialized = True
+
+        self.budget = budget
+        self._pixbufs: OrderedDict[IconKey, GdkPixbuf.Pixbuf] = OrderedDict()
+        self._bytes = 0
+        self._pending: dict[IconKey, list[IconCallback]] = {}
+        # Icons that failed to load, served with the default icon from now on
+        self._missing: set[str] = set()
+
+        Gtk.IconTheme.get_default().connect("changed", lambda *_: self.clear())
+
+    def clear(self):
+        self._pixbufs.clear()
+        self._bytes = 0
+        self._missing.clear()
+
+    def get(
+        self, icon: str | None, size: int, scale: int = 1
+    ) -> GdkPixbuf.Pixbuf | None:
+        """Return the cached pixbuf without scheduling a decode."""
+        key = self._key(icon, size, scale)
+        pixbuf = self._pixbufs.get(key)
+        if pixbuf is not None:
+            self._pixbufs.move_to_end(key)
+        return pixbuf
+
+    def request(
+        self,
+        icon: str | None,
+        size: int,
+        scale: int = 1,
+        callback: IconCallback | None = None,
+    ) -> GdkPixbuf.Pixbuf | None:
+        """
+        Return the cached pixbuf, or decode it in the background.
+
+        On a miss None is returned and `callback` is invoked on the main
+        thread once the icon is ready (with None if even the default icon
+        could not be loaded).
+        """
+        key = self._key(icon, size, scale)
+        if (pixbuf := self.get(*key)) is not None:
+            return pixbuf
+
+        if key in self._pending:
+            if callback is not None:
+                self._pending[key].append(callback)
+            return None
+        self._pending[key] = [callback] if callback is not None else []
+
+        source = self._resolve(*key)
+        if isinstance(source, str):
+            run_in_pool(self._decode, key, source)
+        else:
+            # Built-in icons without a file are already loaded by the theme
+            GLib.idle_add(self._finish, key, source)
+        return None
+
+    def warm(self, icons: Iterable[str | None], size: int, scale: int = 1):
+        """Queue the given icons for decoding without waiting for them."""
+        for icon in icons:
+            self.request(icon, size, scale)
+
+    def _key(self, icon: str | None, size: int, scale: int) -> IconKey:
+        if not icon or icon in self._missing:
+            icon = DEFAULT_ICON
+        return (icon, size, scale)
+
+    def _resolve(self, icon: str, size: int, scale: int):
+        """Filename to decode, or a pixbuf the theme loaded directly."""
+        if os.path.isabs(icon):
+            return icon
+
+        theme = Gtk.IconTheme.get_default()
+        info = theme.lookup_icon_for_scale(
+            icon, size, scale, Gtk.IconLookupFlags.FORCE_SIZE
+        )
+        if info is None:
+            return None
+        if filename := info.get_filename():
+            return filename
+        try:
+            return info.load_icon()
+        except GLib.Error:
+            return None
+
+    def _decode(self, key: IconKey, filename: str):
+        _, size, scale = key
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
+                filename, size * scale, size * scale
+            )
+        except Exception as e:
+            # Any failure must still reach _finish, or the key stays pending
+            logger.warning(f"[IconCache] Failed to load {filename}: {e}")
+            pixbuf = None
+        GLib.idle_add(self._finish, key, pixbuf)
+
+    def _finish(self, key: IconKey, pixbuf: GdkPixbuf.Pixbuf | None) -> bool:
+        callbacks = self._pending.pop(key, [])
+        icon, size, scale = key
+
+        if pixbuf is None and icon != DEFAULT_ICON:
+            self._missing.add(icon)
+            for callback in callbacks:
+                if (fallback := self.request(icon, size, scale, callback)) is not None:
+                    callback(fallback)
+            return False
+
+        if pixbuf is not None:
+            self._store(key, pixbuf)
+        for callback in callbacks:
+            callback(pixbuf)
+        return False
+
+    def _store(self, key: IconKey, pixbuf: GdkPixbuf.Pixbuf):
+        self._pixbufs[key] = pixbuf
+        self._bytes += pixbuf.get_byte_length()
+
+        while self._bytes > self.budget and len(self._pixbufs) > 1:
+            _, evicted = self._pixbufs.popitem(last=False)
+            self._bytes -= evicted.get_byte_length()
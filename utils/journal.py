@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any, List, Tuple
+
+from fabric.utils import logger
+
+# Records appended before the owner is asked for a fresh snapshot
+DEFAULT_COMPACT_EVERY = 256
+
+
+def write_atomic(path: str, text: str):
+    """Replace `path` with `text` so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """
+    Append-only JSON lines log on top of a periodically compacted snapshot.
+
+    Every record gets a sequence number, the snapshot stores the last one it
+    covers, so records that survive a crash between writing the snapshot and
+    truncating the log are not replayed twice. All disk I/O happens in order
+    on a single writer thread.
+
+    `snapshot_func` is called on the appending thread once `compact_every`
+    records were appended, it must return data that is not mutated afterwards.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        snapshot_func: Callable[[], Any] | None = None,
+        compact_every: int = DEFAULT_COMPACT_EVERY,
+    ):
+        self.path = path
+        self.log_path = f"{path}.journal"
+        self.snapshot_func = snapshot_func
+        self.compact_every = compact_every
+
+        self._seq = 0
+        self._since_compaction = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+
+        atexit.register(self.flush)
+
+    def load(self) -> Tuple[Any, List[Any]]:
+        """Read the snapshot data and the records appended after it."""
+        data, snapshot_seq = None, 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if isinstance(snapshot, dict) and "seq" in snapshot:
+                data, snapshot_seq = snapshot.get("data"), snapshot["seq"]
+            else:
+                # Plain files written before the journal existed
+                data = snapshot
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Journal] Ignoring unreadable snapshot {self.path}: {e}")
+
+        records = []
+        self._seq = snapshot_seq
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted write
+                        continue
+                    if seq > snapshot_seq:
+                        records.append(record)
+                        self._seq = max(self._seq, seq)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[Journal] Failed to read {self.log_path}: {e}")
+
+        self._since_compaction = len(records)
+        return data, records
+
+    def append(self, record: Any):
+        """Queue one record for appending to the log."""
+        self._seq += 1
+        line = json.dumps([self._seq, record], ensure_ascii=False)
+        self._submit(("append", line))
+
+        self._since_compaction += 1
+        if self.snapshot_func and self._since_compaction >= self.compact_every:
+            self.compact(self.snapshot_func())
+
+    def compact(self, data: Any):
+        """Queue writing `data` as the new snapshot and truncating the log."""
+        self._since_compaction = 0
+        self._submit(("compact", self._seq, data))
+
+    def flush(self):
+        """Block until every queued write reached the disk."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def _submit(self, job: tuple):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="journal-writer", daemon=True
+                )
+                self._writer.start()
+        self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job[0] == "append":
+                    self._write_line(job[1])
+                else:
+                    self._write_snapshot(job[1], job[2])
+            except Exception as e:
+                logger.error(f"[Journal] Failed to write {self.path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write_line(self, line: str):
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _write_snapshot(self, seq: int, data: Any):
+        write_atomic(
+            self.path, json.dumps({"seq": seq, "data": data}, ensure_ascii=False)
+        )
+        # Only records appended after the snapshot was taken stay in the log
+        kept = []
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if json.loads(line)[0] > seq:
+                            kept.append(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+        write_atomic(self.log_path, "".join(kept))
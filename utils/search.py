@@ -0,0 +1,365 @@
+import bisect
+import heapq
+import re
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from typing import Generic, List, TypeVar
+
+T = TypeVar("T")
+
+# Match tiers, higher is better. Gaps are wider than the frequency bonus so
+# usage can reorder items inside a tier but never lift a weak match over a
+# strong one.
+SCORE_EXACT = 100
+SCORE_PREFIX = 80
+SCORE_WORD_START = 60
+SCORE_ACRONYM = 50
+SCORE_SUBSTRING = 40
+SCORE_OTHER_FIELD = 20
+SCORE_FUZZY = 10
+
+FREQUENCY_WEIGHT = 9.0
+
+# Typo tolerance only kicks in once the query carries enough signal
+FUZZY_MIN_LENGTH = 4
+FUZZY_MAX_DISTANCE = 1
+
+_WORD = re.compile(r"\w+")
+
+
+def prefix_edit_distance(query: str, word: str, limit: int = FUZZY_MAX_DISTANCE):
+    """
+    Edit distance between `query` and the closest prefix of `word`.
+
+    Stops early and returns `limit + 1` once the distance is known to exceed
+    `limit`. The result never decreases when `query` grows, which is what makes
+    narrowing a previous result set safe.
+    """
+    previous = list(range(len(word) + 1))
+    for i, query_char in enumerate(query, 1):
+        current = [i]
+        for j, word_char in enumerate(word, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (query_char != word_char),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous)
+
+
+def _grams(text: str, size: int) -> set[str]:
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+class _Entry:
+    __slots__ = ("acronym", "item", "name", "order", "text", "words")
+
+    def __init__(self, item, name: str, text: str, order: int):
+        self.item = item
+        self.name = name.casefold()
+        self.words = self.name.split()
+        self.acronym = "".join(word[0] for word in self.words)
+        self.text = f"{self.name} {text.casefold()}".strip()
+        self.order = order
+
+
+class SearchIndex(Generic[T]):
+    """
+    Ranked search over a fixed set of items.
+
+    An n-gram index (n = 1..3) over the searchable text answers substring
+    lookups without scanning, acronyms ("gc" -> Google Chrome) are indexed by
+    prefix, and names within one edit of the query are used as a fallback when
+    there are not enough direct matches. When the query only grows, the
+    previous match set is narrowed instead of consulting the index again.
+    """
+
+    def __init__(
+        self,
+        name_func: Callable[[T], str],
+        text_func: Callable[[T], str] | None = None,
+        score_func: Callable[[T], float] | None = None,
+    ):
+        self._name_func = name_func
+        self._text_func = text_func
+        self.score_func = score_func
+
+        self._entries: List[_Entry] = []
+        self._grams: dict[str, set[int]] = {}
+        self._name_bigrams: dict[str, set[int]] = {}
+        self._acronyms: dict[str, set[int]] = {}
+
+        self._last_query = ""
+        self._last_matches: set[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, items: Iterable[T]):
+        """Index `items`, their iteration order breaks ties between equal scores."""
+        self._entries = []
+        self._grams = {}
+        self._name_bigrams = {}
+        self._acronyms = {}
+        self._last_query = ""
+        self._last_matches = None
+
+        for order, item in enumerate(items):
+            entry = _Entry(
+                item,
+                self._name_func(item) or "",
+                self._text_func(item) if self._text_func else "",
+                order,
+            )
+            self._entries.append(entry)
+
+            for size in (1, 2, 3):
+                for gram in _grams(entry.text, size):
+                    self._grams.setdefault(gram, set()).add(order)
+            for word in entry.words:
+                for gram in _grams(word, 2):
+                    self._name_bigrams.setdefault(gram, set()).add(order)
+            for end in range(2, len(entry.acronym) + 1):
+                self._acronyms.setdefault(entry.acronym[:end], set()).add(order)
+
+    def search(self, query: str, limit: int | None = None) -> List[T]:
+        """Return up to `limit` items matching `query`, best match first."""
+        query = query.strip().casefold()
+
+        if not query:
+            self._last_query, self._last_matches = "", None
+            ranked = sorted(self._entries, key=lambda e: (-self._bonus(e), e.order))
+            return [entry.item for entry in ranked[:limit]]
+
+        matches = self._direct_matches(query)
+        self._last_query, self._last_matches = query, matches
+
+        scored = [(self._score(self._entries[i], query), i) for i in matches]
+
+        if len(query) >= FUZZY_MIN_LENGTH and (limit is None or len(scored) < limit):
+            scored.extend(
+                (SCORE_FUZZY + self._bonus(self._entries[i]), i)
+                for i in self._fuzzy_matches(query, matches)
+            )
+
+        def rank(pair):
+            score, index = pair
+            entry = self._entries[index]
+            return (-score, len(entry.name), entry.order)
+
+        if limit is None:
+            best = sorted(scored, key=rank)
+        else:
+            best = heapq.nsmallest(limit, scored, key=rank)
+        return [self._entries[index].item for _, index in best]
+
+    def _direct_matches(self, query: str) -> set[int]:
+        """Indices whose text contains `query` or whose acronym starts with it."""
+        if self._last_matches is not None and query.startswith(self._last_query):
+            return {
+                i
+                for i in self._last_matches
+                if query in self._entries[i].text
+                or self._entries[i].acronym.startswith(query)
+            }
+
+        if len(query) <= 3:
+            matches = set(self._grams.get(query, ()))
+        else:
+            postings = sorted(
+                (self._grams.get(gram, set()) for gram in _grams(query, 3)), key=len
+            )
+            candidates = set(postings[0]).intersection(*postings[1:])
+            matches = {i for i in candidates if query in self._entries[i].text}
+
+        matches.update(self._acronyms.get(query, ()))
+        return matches
+
+    def _fuzzy_matches(self, query: str, exclude: set[int]) -> List[int]:
+        """Indices with a name word within one edit of the query."""
+        # One edit destroys at most two bigrams of the query
+        bigrams = _grams(query, 2)
+        required = max(1, len(bigrams) - 2 * FUZZY_MAX_DISTANCE)
+
+        shared = Counter()
+        for gram in bigrams:
+            shared.update(self._name_bigrams.get(gram, ()))
+
+        return [
+            i
+            for i, count in shared.items()
+            if count >= required
+            and i not in exclude
+            and any(
+                prefix_edit_distance(query, word) <= FUZZY_MAX_DISTANCE
+                for word in self._entries[i].words
+            )
+        ]
+
+    def _score(self, entry: _Entry, query: str) -> float:
+        if entry.name == query:
+            score = SCORE_EXACT
+        elif entry.name.startswith(query):
+            score = SCORE_PREFIX
+        elif any(word.startswith(query) for word in entry.words):
+            score = SCORE_WORD_START
+        elif len(query) > 1 and entry.acronym.startswith(query):
+            score = SCORE_ACRONYM
+        elif query in entry.name:
+            score = SCORE_SUBSTRING
+        else:
+            score = SCORE_OTHER_FIELD
+        return score + self._bonus(entry)
+
+    def _bonus(self, entry: _Entry) -> float:
+        if self.score_func is None:
+            return 0.0
+        frequency = max(0.0, self.score_func(entry.item))
+        # Saturates below FREQUENCY_WEIGHT, the smallest gap between tiers
+        return FREQUENCY_WEIGHT * frequency / (frequency + 1.0)
+
+
+class NarrowingFilter(Generic[T]):
+    """
+    Ordered substring filter over items whose text is casefolded once.
+
+    A query that extends the previous one only rechecks the previous matches,
+    and items appended or removed later keep that result set current.
+    """
+
+    def __init__(self, text_func: Callable[[T], str]):
+        self._text_func = text_func
+        self._items: List[T] = []
+        self._texts: List[str] = []
+
+        self._last_query = ""
+        self._last_matches: List[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def set_items(self, items: Iterable[T]):
+        self._items = []
+        self._texts = []
+        self._last_query, self._last_matches = "", None
+        self.extend(items)
+
+    def extend(self, items: Iterable[T]):
+        start = len(self._items)
+        for item in items:
+            self._items.append(item)
+            self._texts.append(self._text_func(item).casefold())
+
+        if self._last_matches is not None:
+            self._last_matches.extend(
+                i
+                for i in range(start, len(self._items))
+                if self._last_query in self._texts[i]
+            )
+
+    def remove(self, item: T):
+        try:
+            index = self._items.index(item)
+        except ValueError:
+            return
+        del self._items[index]
+        del self._texts[index]
+
+        if self._last_matches is not None:
+            self._last_matches = [
+                i - (i > index) for i in self._last_matches if i != index
+            ]
+
+    def filter(self, query: str) -> List[T]:
+        """Items containing `query`, in their original order."""
+        query = query.casefold()
+        if not query:
+            self._last_query, self._last_matches = "", None
+            return list(self._items)
+
+        if self._last_matches is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self._items))
+
+        matches = [i for i in candidates if query in self._texts[i]]
+        self._last_query, self._last_matches = query, matches
+        return [self._items[i] for i in matches]
+
+
+class PrefixIndex:
+    """
+    Inverted index from words to the positions of the texts containing them.
+
+    Every word of a query has to start a word of a matching text. A word is
+    looked up as a range of the sorted vocabulary, and while the query only
+    grows the previous matches are narrowed instead.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        self._size = len(texts)
+        postings: dict[str, List[int]] = {}
+        for position, text in enumerate(texts):
+            for word in dict.fromkeys(_WORD.findall(text.casefold())):
+                postings.setdefault(word, []).append(position)
+
+        self._vocabulary = sorted(postings)
+        self._postings = [postings[word] for word in self._vocabulary]
+
+        self._last_query: List[str] = []
+        self._last_matches: List[int] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def search(self, query: str) -> List[int] | None:
+        """Ascending positions matching `query`, None if the query is empty."""
+        words = _WORD.findall(query.casefold())
+        if not words:
+            self._last_query, self._last_matches = [], []
+            return None
+
+        last = self._last_query
+        if self._extends_last_query(words):
+            # Only the words that grew can drop previous matches
+            found = set(self._last_matches)
+            changed = [
+                word
+                for i, word in enumerate(words)
+                if i >= len(last) or word != last[i]
+            ]
+        else:
+            found, changed = None, words
+
+        # Rarest word first keeps the intersection small
+        for positions in sorted(map(self._lookup, changed), key=len):
+            found = set(positions) if found is None else found.intersection(positions)
+            if not found:
+                break
+        matches = sorted(found or ())
+
+        self._last_query, self._last_matches = words, matches
+        return matches
+
+    def _extends_last_query(self, words: List[str]) -> bool:
+        last = self._last_query
+        return (
+            bool(last)
+            and len(words) >= len(last)
+            and all(word.startswith(prefix) for word, prefix in zip(words, last))
+        )
+
+    def _lookup(self, prefix: str) -> List[int]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff", start)
+        if end - start == 1:
+            return self._postings[start]
+        positions = set()
+        for posting in self._postings[start:end]:
+            positions.update(posting)
+        return list(positions)
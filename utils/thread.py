@@ -1,5 +1,13 @@
+import os
 import threading
 from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Shared by all short background jobs, sized so bulk work never floods the CPU
+POOL_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
 
 
 # taken from ignis
@@ -28,3 +36,24 @@ def run_in_thread(func: Callable) -> Callable:
         return thread(func, *args, **kwargs)
 
     return wrapper
+
+
+def run_in_pool(target: Callable, *args, **kwargs) -> Future:
+    """
+    Run the given function on the shared, bounded worker pool.
+    Prefer this over `thread` for jobs that are queued in bulk, such as
+    decoding images, so they do not each start a thread.
+
+    Args:
+        target: The function to run.
+
+    Returns:
+        A future for the result of the function.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=POOL_MAX_WORKERS, thread_name_prefix="worker"
+            )
+    return _pool.submit(target, *args, **kwargs)
@@ -0,0 +1,80 @@
+import functools
+import math
+import time
+from typing import Dict, List, Tuple
+
+from utils.constants import USAGE_DIRECTORY
+from utils.journal import Journal
+
+# A use counts half as much after this many seconds
+HALF_LIFE = 7 * 24 * 60 * 60
+
+_DECAY_RATE = math.log(2) / HALF_LIFE
+
+
+class UsageTracker:
+    """
+    Frecency table for things the user picks, persisted through a journal.
+
+    Each key keeps one exponentially decaying score: a use adds 1 and the
+    score halves every `HALF_LIFE` seconds, so looking up a score is O(1) and
+    frequent as well as recent picks rank high. Uses are appended to the
+    journal off the main thread and compacted into the table periodically.
+    """
+
+    def __init__(self, name: str, path: str | None = None):
+        self.name = name
+        # key -> (score, timestamp the score was last brought up to date)
+        self._table: Dict[str, Tuple[float, float]] = {}
+        self._journal = Journal(
+            path or f"{USAGE_DIRECTORY}/{name}.json", snapshot_func=self._snapshot
+        )
+
+        data, records = self._journal.load()
+        for key, (score, timestamp) in (data or {}).items():
+            self._table[key] = (score, timestamp)
+        for key, timestamp in records:
+            self._apply(key, timestamp)
+
+    def record(self, key: str, timestamp: float | None = None):
+        """Count one use of `key`."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._apply(key, timestamp)
+        self._journal.append([key, timestamp])
+
+    def score(self, key: str, now: float | None = None) -> float:
+        """Current frecency of `key`, 0 if it was never used."""
+        entry = self._table.get(key)
+        if entry is None:
+            return 0.0
+        score, timestamp = entry
+        now = time.time() if now is None else now
+        return score * math.exp(-_DECAY_RATE * max(0.0, now - timestamp))
+
+    def ranked(self, now: float | None = None) -> List[str]:
+        """Every used key, highest frecency first."""
+        now = time.time() if now is None else now
+        return sorted(self._table, key=lambda key: self.score(key, now), reverse=True)
+
+    def flush(self):
+        """Block until all recorded uses are on disk."""
+        self._journal.flush()
+
+    def _apply(self, key: str, timestamp: float):
+        score = self.score(key, now=timestamp)
+        self._table[key] = (score + 1.0, max(timestamp, self._last_seen(key)))
+
+    def _last_seen(self, key: str) -> float:
+        entry = self._table.get(key)
+        return entry[1] if entry else 0.0
+
+    def _snapshot(self) -> Dict:
+        return {
+            key: [score, timestamp] for key, (score, timestamp) in self._table.items()
+        }
+
+
+@functools.cache
+def get_usage_tracker(name: str) -> UsageTracker:
+    """Tracker shared by every widget ranking `name`, so one journal is written."""
+    return UsageTracker(name)
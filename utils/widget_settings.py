@@ -57,6 +57,7 @@ class Notification(TypedDict):
     play_sound: bool
     sound_file: str
     max_count: int
+    max_popups: int
     dismiss_on_hover: bool
     max_actions: int
     per_app_limits: dict[str, int]
@@ -1,7 +1,6 @@
+import bisect
 import os
 import re
-import subprocess
-import tempfile
 from urllib.parse import unquote, urlparse
 
 from fabric.utils import remove_handler
@@ -11,16 +10,17 @@ from fabric.widgets.entry import Entry
 from fabric.widgets.image import Image
 from fabric.widgets.label import Label
 from fabric.widgets.scrolledwindow import ScrolledWindow
-from gi.repository import Gdk, GdkPixbuf, GLib
-from fabric.utils import logger
+from gi.repository import Gdk, GLib, Gtk
 
+from services.cliphist import ClipHistory, ClipItem
+from services.clip_thumbnails import ClipThumbnails
 from shared.list import ListBox
 from shared.pop_over import Popover
 from shared.widget_container import ButtonWidget
+from utils.search import NarrowingFilter
 from utils.widget_utils import nerd_font_icon
 
 
-# TODO: add scrolled pagination
 class ClipHistoryMenu(Box):
     """A widget to display and manage clipboard history."""
 
@@ -33,25 +33,71 @@ class ClipHistoryMenu(Box):
             **kwargs,
         )
 
-        # Create a temporary directory for image icons
-        self.tmp_dir = tempfile.mkdtemp(prefix="cliphist-")
-        self.image_cache = {}  # Cache for image previews
+        self.thumbnails = ClipThumbnails()
 
-        self.selected_index = -1  # Track the selected item index
+        self.selected_index = -1  # Index into visible_items
+        self._selected_button = None
         self._arranger_handler = 0
-        self.clipboard_items = []
-        self._loading = False
-        self._pending_updates = False
 
-        # Pagination state, reset for new scan
-        self.items_loaded = 0
-        self.batch_size = 7
-        self.loading = False
-        self.max_items = 0  # ← LIMIT HERE
-
-        self._search_timer_id = 0  # Timer ID for search text change
+        # Casefolded once per item, narrowing queries recheck earlier matches
+        self._filter = NarrowingFilter(text_func=lambda item: item.content)
+        self._synced = False
+        # Items matching the current query, in history order
+        self.visible_items: list[ClipItem] = []
+        self._visible_ids: set[str] = set()
+        # Rows are built once per item and only hidden by the list filter
+        self._items: dict[str, ClipItem] = {}
+        self._rows: dict[str, Button] = {}
+        self._row_ids: dict[Gtk.ListBoxRow, str] = {}
+        # History position of every item and of the rows in viewport order
+        self._sequence: dict[str, int] = {}
+        self._row_sequences: list[int] = []
+        # Only goes up, removals must not free a position for reuse
+        self._next_sequence = 0
+
+        self.history = ClipHistory()
+        self._history_handlers = [
+            self.history.connect("reset", self._on_history_reset),
+            self.history.connect("page-loaded", self._on_page_loaded),
+            self.history.connect("loaded", self._on_history_loaded),
+            self.history.connect("item-removed", self._on_item_removed),
+            self.history.connect("changed", self._on_history_changed),
+        ]
+        self.connect("destroy", self._disconnect_history)
 
         self.viewport = ListBox(name="viewport", spacing=4, orientation="v")
+        self.viewport.set_filter_func(
+            lambda row: self._row_ids.get(row) in self._visible_ids
+        )
+
+        self._placeholder_label = Label(
+            name="no-clip",
+            label="Clipboard history is empty",
+            h_align="center",
+            v_align="center",
+        )
+        # Shown by the list whenever no row passes the filter
+        self.placeholder = Box(
+            name="no-clip-container",
+            orientation="v",
+            h_align="center",
+            v_align="center",
+            h_expand=True,
+            spacing=10,
+            v_expand=True,
+            children=[
+                Image(
+                    name="no-clip-icon",
+                    icon_name="clipboard-symbolic",
+                    icon_size=32,
+                    h_align="center",
+                    v_align="center",
+                ),
+                self._placeholder_label,
+            ],
+        )
+        self.placeholder.show_all()
+        self.viewport.set_placeholder(self.placeholder)
 
         self.search_entry = Entry(
             name="search-entry",
@@ -61,7 +107,7 @@ class ClipHistoryMenu(Box):
             on_key_press_event=self.on_search_entry_key_press,
         )
 
-        self.search_entry.connect("notify::text", self._on_search_text_changed)
+        self.search_entry.connect("notify::text", self.filter_items)
 
         self.search_entry.props.xalign = 0.1
 
@@ -102,153 +148,142 @@ class ClipHistoryMenu(Box):
         self.add(self.history_box)
         self.open()  # Load items when the widget is created
 
-    def load_more_items(self, aps):
-        if self.loading or self.items_loaded >= self.max_items:
-            return
-        self.loading = True
-
-        items_to_add = min(self.batch_size, self.max_items - self.items_loaded)
-
-        for i in range(self.items_loaded, self.items_loaded + items_to_add):
-            notification_item = self.make_button_from_ap(aps[i])
-            self.viewport.add(notification_item)
-
-        self.items_loaded += items_to_add
-        self.loading = False
-
-    def _on_search_text_changed(self, entry, pspec):
-        # Remove any existing pending filter operation
-        if self._search_timer_id > 0:
-            GLib.source_remove(self._search_timer_id)
-            self._search_timer_id = 0
-
-        # Start a new timer to filter after a delay
-        self._search_timer_id = GLib.timeout_add(
-            250,  # Milliseconds delay (e.g., 250ms)
-            lambda: self._perform_filter_after_delay(entry),
-        )
-
-    def _perform_filter_after_delay(self, entry):
-        self.filter_items(entry, None)  # Call the actual filter method
-        self._search_timer_id = 0  # Reset the timer ID
-        return False  # Do not repeat the timeout
-
     def close(self, *_):
         """Close the clipboard history panel"""
-        self.viewport.children = []
-        self.selected_index = -1  # Reset selection
+        self.update_selection(-1)  # Reset selection
 
     def open(self):
         """Open the clipboard history panel and load items"""
-        if self._loading:
-            return
-        self._loading = True
         self.search_entry.set_text("")  # Clear search
         self.search_entry.grab_focus()
-        # Start loading in background using GLib.idle_add
-        GLib.idle_add(self._load_clipboard_items_thread)
-
-    def _load_clipboard_items_thread(self):
-        """Worker for loading clipboard items, now runs in main loop via idle_add"""
-        try:
-            result = subprocess.run(
-                ["cliphist", "list"], capture_output=True, text=True, check=True
-            )
-            lines = result.stdout.strip().split("\n")
-            new_items = []
-            for line in lines:
-                if not line or "<meta http-equiv" in line:
-                    continue
-                new_items.append(line)
-            self._update_items(new_items)
-        except subprocess.CalledProcessError as e:
-            logger.exception(f"Error loading clipboard history: {e}")
-        except Exception as e:
-            logger.exception(f"Unexpected error: {e}")
-        finally:
-            self._loading = False
-            if self._pending_updates:
-                self._pending_updates = False
-                GLib.idle_add(self._load_clipboard_items_thread)
-        return False  # Ensure idle_add does not repeat
-
-    def _update_items(self, new_items):
-        """Update the items list from main thread"""
-        self.clipboard_items = new_items
-        self.display_clipboard_items()
-
-    def display_clipboard_items(self, filter_text=""):
-        """Display clipboard items in the viewport"""
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
+        # Pages arrive through signals when cliphist has to be listed again
+        if not self.history.refresh() and not self._synced:
+            self._on_history_reset()
+            self._on_page_loaded(self.history, self.history.items)
+            self._on_history_loaded()
+
+    def _disconnect_history(self, *_):
+        for handler in self._history_handlers:
+            self.history.disconnect(handler)
+        self._history_handlers = []
+
+    def _on_history_changed(self, *_):
+        # Hidden menus pick the change up on the next open
+        if self.get_mapped():
+            self.history.refresh()
+
+    def _on_history_reset(self, *_):
+        self._synced = True
+        self._clear_rows()
+        self._filter.set_items([])
+        self._items = {}
+        self._sequence = {}
+        self._next_sequence = 0
+        self._apply_filter()
+
+    def _on_page_loaded(self, _, page):
+        for item in page:
+            self._items[item.id] = item
+            self._sequence[item.id] = self._next_sequence
+            self._next_sequence += 1
+        self._filter.extend(page)
+        self._apply_filter()
+
+    def _on_history_loaded(self, *_):
+        self._update_placeholder()
+
+    def _on_item_removed(self, _, item_id):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        self._filter.remove(item)
+
+        if (button := self._rows.pop(item_id, None)) is not None:
+            row = button.get_parent()
+            del self._row_ids[row]
+            index = bisect.bisect_left(self._row_sequences, self._sequence[item_id])
+            del self._row_sequences[index]
+            self.viewport.remove(row)
+            row.destroy()
+        del self._sequence[item_id]
+
+        selected = self.selected_index
+        self.visible_items = [item for item in self.visible_items if item.id != item_id]
+        self._visible_ids.discard(item_id)
+        self.update_selection(min(selected, len(self.visible_items) - 1))
+        self._update_placeholder()
+
+    def _clear_rows(self):
+        if self._arranger_handler:
+            remove_handler(self._arranger_handler)
+            self._arranger_handler = 0
+        self.update_selection(-1)
         self.viewport.remove_all()
-        self.selected_index = -1  # Reset selection
-
-        # Filter items if search text is provided
-        filtered_items = []
-        for item in self.clipboard_items:
-            # Extract just the content part (after the first tab)
-            content = item.split("\t", 1)[1] if "\t" in item else item
-            if filter_text.lower() in content.lower():
-                filtered_items.append(item)
-
-        # Show message if no items are found
-        if not filtered_items:
-            # Create a container box to better center the message
-            container = Box(
-                name="no-clip-container",
-                orientation="v",
-                h_align="center",
-                v_align="center",
-                h_expand=True,
-                spacing=10,
-                v_expand=True,
-            )
+        self.visible_items = []
+        self._visible_ids = set()
+        self._rows = {}
+        self._row_ids = {}
+        self._row_sequences = []
+
+    def _apply_filter(self):
+        """Show the rows matching the search text, building missing ones lazily"""
+        query = self.search_entry.get_text()
+        self.visible_items = self._filter.filter(query)
+        self._visible_ids = {item.id for item in self.visible_items}
+        self.viewport.invalidate_filter()
+
+        if not self._arranger_handler and any(
+            item.id not in self._rows for item in self.visible_items
+        ):
+            self._arranger_handler = GLib.idle_add(self._add_missing_rows)
 
-            # Show a message if no clipboard items
-            label = Label(
-                name="no-clip",
-                label="Clipboard history is empty",
-                h_align="center",
-                v_align="center",
-            )
-            image = Image(
-                name="no-clip-icon",
-                icon_name="clipboard-symbolic",
-                icon_size=32,
-                h_align="center",
-                v_align="center",
-            )
+        # Auto-select first item if we have filter text
+        self.update_selection(0 if query and self.visible_items else -1)
+        self._update_placeholder()
 
-            container.add(image)
-            container.add(label)
-            self.viewport.add(container)
-            return
+    def _add_missing_rows(self, batch_size=20):
+        """Build rows for visible items in batches to keep UI responsive"""
+        missing = [item for item in self.visible_items if item.id not in self._rows]
+        for item in missing[:batch_size]:
+            self._add_row(item)
 
-        # Display items in batches to prevent UI freeze
-        self._display_items_batch(filtered_items, 0, 10)
+        if len(missing) > batch_size:
+            return True
+        self._arranger_handler = 0
+        return False
 
-    def _display_items_batch(self, items, start, batch_size):
-        """Display items in batches to keep UI responsive"""
-        end = min(start + batch_size, len(items))
+    def _add_row(self, item: ClipItem):
+        button = self.create_clipboard_item(item)
+        sequence = self._sequence[item.id]
+        # Keep the viewport in history order
+        position = bisect.bisect(self._row_sequences, sequence)
+        self._row_sequences.insert(position, sequence)
+        self.viewport.insert(button, position)
+        self._rows[item.id] = button
+        row = button.get_parent()
+        self._row_ids[row] = item.id
+        # The filter ran on insert before the row was known
+        row.changed()
 
-        for i in range(start, end):
-            item = items[i]
-            self.viewport.add(self.create_clipboard_item(item))
+        if (
+            0 <= self.selected_index < len(self.visible_items)
+            and self.visible_items[self.selected_index] is item
+        ):
+            self.update_selection(self.selected_index)
 
-        # Schedule next batch if there are more items
-        if end < len(items):
-            GLib.idle_add(self._display_items_batch, items, end, batch_size)
+    def _update_placeholder(self):
+        if self.history.loading:
+            text = "Loading clipboard history"
+        elif self.search_entry.get_text() and len(self._filter):
+            text = "No matching items"
         else:
-            # Auto-select first item if we have filter text
-            if self.search_entry.get_text() and self.viewport.get_children():
-                self.update_selection(0)
+            text = "Clipboard history is empty"
+        self._placeholder_label.set_label(text)
 
-    def create_clipboard_item(self, item):
+    def create_clipboard_item(self, item: ClipItem):
         """Create a button for a clipboard item"""
-        # Extract ID and content
-        parts = item.split("\t", 1)
-        item_id = parts[0] if len(parts) > 1 else "0"
-        content = parts[1] if len(parts) > 1 else item
+        item_id = item.id
+        content = item.content
 
         # Truncate content for display
         display_text = content.strip()
@@ -286,7 +321,7 @@ class ClipHistoryMenu(Box):
                 on_clicked=lambda *_, id=item_id: self.paste_item(id),
             )
             # Load image preview in background
-            self._load_image_preview_async(item_id, button)
+            self._load_image_preview_async(item, button)
 
         elif is_file_image:
             button = Button(
@@ -296,12 +331,7 @@ class ClipHistoryMenu(Box):
                     orientation="h",
                     spacing=10,
                     children=[
-                        Image(
-                            name="clip-icon",
-                            h_align="start",
-                            image_file=unquote(urlparse(content).path),
-                            size=72,
-                        ),  # Placeholder
+                        Image(name="clip-icon", h_align="start"),  # Placeholder
                         Label(
                             name="clip-label",
                             label="[File]",
@@ -315,6 +345,7 @@ class ClipHistoryMenu(Box):
                 tooltip_text="File in clipboard",
                 on_clicked=lambda *_, id=item_id: self.paste_item(id),
             )
+            self._load_file_preview_async(unquote(urlparse(content).path), button)
         else:
             # For text, create regular item
             button = self.create_text_item_button(item_id, display_text)
@@ -331,45 +362,26 @@ class ClipHistoryMenu(Box):
 
         return button
 
-    def _load_image_preview_async(self, item_id, button):
-        """Load image preview using GLib.idle_add instead of threads"""
-
-        def load_image():
-            try:
-                if item_id in self.image_cache:
-                    pixbuf = self.image_cache[item_id]
-                else:
-                    result = subprocess.run(
-                        ["cliphist", "decode", item_id], capture_output=True, check=True
-                    )
-                    loader = GdkPixbuf.PixbufLoader()
-                    loader.write(result.stdout)
-                    loader.close()
-                    pixbuf = loader.get_pixbuf()
-                    if pixbuf is None:
-                        return False
-
-                    width, height = pixbuf.get_width(), pixbuf.get_height()
-                    max_size = 72
-                    if width > height:
-                        new_width = max_size
-                        new_height = int(height * (max_size / width))
-                    else:
-                        new_height = max_size
-                        new_width = int(width * (max_size / height))
-                    pixbuf = pixbuf.scale_simple(
-                        new_width, new_height, GdkPixbuf.InterpType.BILINEAR
-                    )
-                    self.image_cache[item_id] = pixbuf
-                self._update_image_button(button, pixbuf)
-            except Exception as e:
-                logger.exception(f"Error loading image preview: {e}")
-            return False
+    def _load_image_preview_async(self, item, button):
+        """Show the thumbnail once the worker pool decoded it"""
+        pixbuf = self.thumbnails.request(
+            item, lambda pixbuf: self._update_image_button(button, pixbuf)
+        )
+        if pixbuf is not None:
+            self._update_image_button(button, pixbuf)
 
-        GLib.idle_add(load_image)
+    def _load_file_preview_async(self, path, button):
+        """Show the thumbnail of a copied image file once it is decoded"""
+        pixbuf = self.thumbnails.request_file(
+            path, lambda pixbuf: self._update_image_button(button, pixbuf)
+        )
+        if pixbuf is not None:
+            self._update_image_button(button, pixbuf)
 
     def _update_image_button(self, button, pixbuf):
         """Update the button with the loaded image preview"""
+        if pixbuf is None:
+            return
         box = button.get_child()
         if box and len(box.get_children()) > 0:
             image_widget = box.get_children()[0]
@@ -419,71 +431,19 @@ class ClipHistoryMenu(Box):
 
     def paste_item(self, item_id):
         """Copy the selected item (text or image) to the clipboard"""
-
-        def paste():
-            try:
-                # Don’t use text=True here so we get raw bytes
-                result = subprocess.run(
-                    ["cliphist", "decode", item_id], capture_output=True, check=True
-                )
-
-                data = result.stdout
-
-                # Heuristics for detecting image
-                if (
-                    data.startswith(b"\x89PNG")
-                    or data.startswith(b"\xff\xd8\xff")
-                    or data.startswith(b"GIF8")
-                ):
-                    # PNG, JPEG, or GIF
-                    subprocess.run(
-                        ["wl-copy", "--type", "image/png"], input=data, check=True
-                    )
-                else:
-                    # Treat as text
-                    subprocess.run(["wl-copy"], input=data, check=True)
-
-                GLib.idle_add(self.close)
-
-            except subprocess.CalledProcessError as e:
-                logger.exception(f"Error pasting clipboard item: {e}")
-            return False
-
-        GLib.idle_add(paste)
+        self.history.paste(item_id, lambda success: success and self.close())
 
     def delete_item(self, item_id):
-        """Delete the selected clipboard item (GLib.idle_add)"""
-
-        def delete():
-            try:
-                subprocess.run(["cliphist", "delete", item_id], check=True)
-                self._pending_updates = True
-                if not self._loading:
-                    GLib.idle_add(self._load_clipboard_items_thread)
-            except subprocess.CalledProcessError as e:
-                logger.exception(f"Error deleting clipboard item: {e}")
-            return False
-
-        GLib.idle_add(delete)
+        """Delete the selected clipboard item"""
+        self.history.delete(item_id)
 
     def clear_history(self, *_):
-        """Clear all clipboard history (GLib.idle_add)"""
-
-        def clear():
-            try:
-                subprocess.run(["cliphist", "wipe"], check=True)
-                self._pending_updates = True
-                if not self._loading:
-                    GLib.idle_add(self._load_clipboard_items_thread)
-            except subprocess.CalledProcessError as e:
-                logger.exception(f"Error clearing clipboard history: {e}")
-            return False
+        """Clear all clipboard history"""
+        self.history.wipe()
 
-        GLib.idle_add(clear)
-
-    def filter_items(self, entry, *_):
+    def filter_items(self, *_):
         """Filter clipboard items based on search text"""
-        self.display_clipboard_items(entry.get_text())
+        self._apply_filter()
 
     def on_search_entry_key_press(self, widget, event):
         """Handle key presses in the search entry"""
@@ -506,26 +466,26 @@ class ClipHistoryMenu(Box):
 
     def update_selection(self, new_index):
         """Update the selected item in the viewport"""
-        children = self.viewport.get_children()
-
         # Unselect current
-        if self.selected_index != -1 and self.selected_index < len(children):
-            current_button = children[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-
-        # Select new
-        if new_index != -1 and new_index < len(children):
-            new_button = children[new_index]
-            new_button.get_style_context().add_class("selected")
-            self.selected_index = new_index
-            self.scroll_to_selected(new_button)
-        else:
+        if self._selected_button is not None:
+            self._selected_button.get_style_context().remove_class("selected")
+            self._selected_button = None
+
+        if not 0 <= new_index < len(self.visible_items):
             self.selected_index = -1
+            return
+
+        # Select new, its row may still be waiting to be built
+        self.selected_index = new_index
+        button = self._rows.get(self.visible_items[new_index].id)
+        if button is not None:
+            button.get_style_context().add_class("selected")
+            self._selected_button = button
+            self.scroll_to_selected(button.get_parent())
 
     def move_selection(self, delta):
         """Move the selection up or down"""
-        children = self.viewport.get_children()
-        if not children:
+        if not self.visible_items:
             return
 
         # Allow starting selection from nothing
@@ -534,7 +494,7 @@ class ClipHistoryMenu(Box):
         else:
             new_index = self.selected_index + delta
 
-        new_index = max(0, min(new_index, len(children) - 1))
+        new_index = max(0, min(new_index, len(self.visible_items) - 1))
         self.update_selection(new_index)
 
     def scroll_to_selected(self, button):
@@ -568,29 +528,13 @@ class ClipHistoryMenu(Box):
 
     def use_selected_item(self, *_):
         """Use (paste) the selected clipboard item"""
-        children = self.viewport.get_children()
-        if (
-            not children
-            or self.selected_index == -1
-            or self.selected_index >= len(self.clipboard_items)
-        ):
-            return
-
-        # Get the item ID from the first part before the tab
-        item_line = self.clipboard_items[self.selected_index]
-        item_id = item_line.split("\t", 1)[0]
-        self.paste_item(item_id)
+        if 0 <= self.selected_index < len(self.visible_items):
+            self.paste_item(self.visible_items[self.selected_index].id)
 
     def delete_selected_item(self):
         """Delete the selected clipboard item"""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1:
-            return
-
-        # Get the item ID from the first part before the tab
-        item_line = self.clipboard_items[self.selected_index]
-        item_id = item_line.split("\t", 1)[0]
-        self.delete_item(item_id)
+        if 0 <= self.selected_index < len(self.visible_items):
+            self.delete_item(self.visible_items[self.selected_index].id)
 
     def on_item_key_press(self, widget, event, item_id):
         """Handle key press events on clipboard items"""
@@ -600,17 +544,6 @@ class ClipHistoryMenu(Box):
             return True
         return False
 
-    def __del__(self):
-        """Clean up temporary files on destruction"""
-        try:
-            if hasattr(self, "tmp_dir") and os.path.exists(self.tmp_dir):
-                import shutil
-
-                shutil.rmtree(self.tmp_dir)
-            self.image_cache.clear()
-        except Exception as e:
-            logger.exception(f"Error cleaning up temporary files: {e}")
-
 
 class ClipHistoryWidget(ButtonWidget):
     """A widget to display and manage clipboard history."""
@@ -637,16 +570,27 @@ class ClipHistoryWidget(ButtonWidget):
             self.set_tooltip_text("Clipboard History")
 
         self.popup = None
+        # Built on the first click and reused by every popover after that
+        self.menu: ClipHistoryMenu | None = None
 
         self.connect(
             "clicked",
             self.show_popover,
         )
 
+    def _get_menu(self) -> ClipHistoryMenu:
+        if self.menu is None:
+            self.menu = ClipHistoryMenu()
+        return self.menu
+
     def show_popover(self, *_):
         """Show the popover."""
-        self.popup = Popover(
-            content=ClipHistoryMenu(),
-            point_to=self,
-        )
+        if self.popup is None:
+            self.popup = Popover(
+                content_factory=self._get_menu,
+                point_to=self,
+            )
+        elif self.menu is not None:
+            # Only lists cliphist again if the history changed meanwhile
+            self.menu.open()
         self.popup.open()
@@ -1,19 +1,21 @@
 import os
 import subprocess
+from typing import List
 
-import ijson  # type: ignore
 from fabric.utils import remove_handler
 from fabric.utils.helpers import get_relative_path
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
 from fabric.widgets.label import Label
-from fabric.widgets.stack import Stack
 from gi.repository import Gdk
 from fabric.utils import logger
 
 from shared.pop_over import Popover
 from shared.widget_container import ButtonWidget
+from utils.constants import EMOJI_CACHE_FILE
+from utils.emoji_db import EmojiDatabase, load_emoji_database
+from utils.usage import get_usage_tracker
 from utils.widget_utils import nerd_font_icon
 
 
@@ -26,23 +28,38 @@ class EmojiPickerMenu(Box):
             **kwargs,
         )
 
-        self._page_cache = {}
-
         self.selected_index = -1
-        self.emojis_per_page = config.get("per_row", 5) * config.get("per_column", 5)
+        self.per_row = max(1, config.get("per_row", 9))
+        self.per_column = max(1, config.get("per_column", 4))
+        self.emojis_per_page = self.per_row * self.per_column
         self.current_page_index = 0
         self.filtered_emojis = []
         self.total_pages = 0
 
         self._arranger_handler: int = 0
-        self._all_emojis = self._load_emoji_data()
-
-        self.stack = Stack(
-            name="viewport",
-            spacing=4,
-            orientation="v",
-            transition_type="slide-up-down",
-            transition_duration=200,
+        self._emojis = self._load_emoji_data()
+        self.usage = get_usage_tracker("emoji")
+
+        # One page worth of slots, rebound to other emojis on paging and search
+        self._slots = [self.bake_emoji_slot() for _ in range(self.emojis_per_page)]
+        self._bound_count = 0
+        self._rows = [
+            Box(
+                name="emoji-row-box",
+                orientation="h",
+                spacing=2,
+                children=self._slots[start : start + self.per_row],
+            )
+            for start in range(0, self.emojis_per_page, self.per_row)
+        ]
+        for widget in (*self._slots, *self._rows):
+            # Visibility follows the bound emojis, not the popover's show_all
+            widget.set_no_show_all(True)
+        self.grid_box = Box(
+            name="emoji-grid-box", orientation="v", spacing=2, children=self._rows
+        )
+        self.viewport = Box(
+            name="viewport", orientation="v", spacing=4, children=[self.grid_box]
         )
         self.search_entry = Entry(
             name="search-entry",
@@ -63,7 +80,7 @@ class EmojiPickerMenu(Box):
             orientation="v",
             children=[
                 self.search_entry,
-                self.stack,
+                self.viewport,
             ],
         )
 
@@ -71,23 +88,21 @@ class EmojiPickerMenu(Box):
 
         self.add(self.picker_box)
 
-    def _load_emoji_data(self):
-        emoji_data = {}
+    def _load_emoji_data(self) -> EmojiDatabase | None:
         emoji_file_path = get_relative_path("../assets/emoji.json")
         if not os.path.exists(emoji_file_path):
             logger.exception(f"Emoji JSON file not found at: {emoji_file_path}")
-            return {}
+            return None
 
-        with open(emoji_file_path, "r") as f:
-            emoji_data = {
-                emoji_char: emoji_info
-                for emoji_char, emoji_info in ijson.kvitems(f, "")
-            }
-        return emoji_data
+        # Compiled once per emoji.json change, then memory-mapped and shared
+        try:
+            return load_emoji_database(emoji_file_path, EMOJI_CACHE_FILE)
+        except (OSError, ValueError) as e:
+            logger.exception(f"Failed to load emoji data: {e}")
+            return None
 
     def close_picker(self):
-        self.stack.children = []
-        self.selected_index = -1
+        self.update_selection(-1)
         if parent := self.get_parent():
             parent.hide_popover()  # type: ignore
 
@@ -99,19 +114,10 @@ class EmojiPickerMenu(Box):
 
     def arrange_viewport(self, query: str = ""):
         remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.stack.children = []
-        self._page_cache.clear()
-        self.selected_index = -1
+        self.update_selection(-1)
         self.current_page_index = 0
 
-        self.filtered_emojis = [
-            (emoji_char, emoji_info)
-            for emoji_char, emoji_info in self._all_emojis.items()
-            if query.casefold()
-            in (
-                emoji_info.get("name", "") + " " + emoji_info.get("group", "")
-            ).casefold()
-        ]
+        self.filtered_emojis = self._search(query)
         self.total_pages = (
             (len(self.filtered_emojis) + self.emojis_per_page - 1)
             // self.emojis_per_page
@@ -127,41 +133,44 @@ class EmojiPickerMenu(Box):
         if query.strip() != "" and self.get_all_emoji_buttons():
             self.update_selection(0)
 
-    def load_page(self, page_index):
-        self.update_selection(-1)
-
-        if page_index in self._page_cache:
-            self.stack.set_visible_child_name(f"page-{page_index}")
-            return
+    def _search(self, query: str) -> List[int]:
+        """Emoji positions matching `query`, most used first."""
+        if self._emojis is None:
+            return []
 
-        page_box = Box(name=f"page-box-{page_index}", orientation="v", spacing=4)
+        matches = self._emojis.search_index.search(query)
+        positions = self._emojis.positions
+        recent = [positions[char] for char in self.usage.ranked() if char in positions]
+        if matches is None:
+            matches = range(len(self._emojis))
+        else:
+            matched = set(matches)
+            recent = [index for index in recent if index in matched]
 
-        start_index = page_index * self.emojis_per_page
-        end_index = min(
-            (page_index + 1) * self.emojis_per_page, len(self.filtered_emojis)
-        )
-        page_emojis = self.filtered_emojis[start_index:end_index]
+        used = set(recent)
+        return recent + [index for index in matches if index not in used]
 
-        grid_box = Box(name="emoji-grid-box", orientation="v", spacing=2)
-        row_box = None
+    def load_page(self, page_index):
+        self.update_selection(-1)
 
-        for i, (emoji_char, emoji_info) in enumerate(page_emojis):
-            if i % 9 == 0:
-                row_box = Box(name="emoji-row-box", orientation="h", spacing=2)
-                grid_box.add(row_box)
-            if row_box is not None:
-                row_box.add(self.bake_emoji_slot(emoji_char, emoji_info))
+        start_index = page_index * self.emojis_per_page
+        page_emojis = self.filtered_emojis[
+            start_index : start_index + self.emojis_per_page
+        ]
 
-        page_box.add(grid_box)
+        for slot, emoji_index in zip(self._slots, page_emojis):
+            self.bind_emoji_slot(slot, emoji_index)
+        for slot in self._slots[len(page_emojis) : self._bound_count]:
+            slot.set_visible(False)
+        self._bound_count = len(page_emojis)
 
-        self.stack.add_named(page_box, f"page-{page_index}")
-        self.stack.set_visible_child_name(f"page-{page_index}")
-        self._page_cache[page_index] = page_box
+        for row, row_box in enumerate(self._rows):
+            row_box.set_visible(row * self.per_row < self._bound_count)
 
     def resize_viewport(self):
         return False
 
-    def bake_emoji_slot(self, emoji_char: str, emoji_info: dict, **kwargs) -> Button:
+    def bake_emoji_slot(self, **kwargs) -> Button:
         button = Button(
             name="emoji-slot-button",
             child=Box(
@@ -172,7 +181,6 @@ class EmojiPickerMenu(Box):
                 children=[
                     Label(
                         name="emoji-char-label",
-                        label=emoji_char,
                         use_markup=True,
                         v_align="center",
                         h_align="center",
@@ -180,15 +188,28 @@ class EmojiPickerMenu(Box):
                     ),
                 ],
             ),
-            tooltip_text=emoji_info.get("name", "Unknown"),
-            on_clicked=lambda *_: (
-                self.copy_emoji_to_clipboard(emoji_char),
-                self.close_picker(),
-            ),
+            visible=False,
             **kwargs,
         )
+        button.emoji_index = -1
+        button.connect("clicked", self.on_emoji_slot_clicked)
         return button
 
+    def bind_emoji_slot(self, slot: Button, emoji_index: int):
+        if slot.emoji_index != emoji_index:
+            slot.emoji_index = emoji_index
+            slot.get_child().get_children()[0].set_label(
+                self._emojis.chars[emoji_index]
+            )
+            slot.set_tooltip_text(self._emojis.names[emoji_index] or "Unknown")
+        slot.set_visible(True)
+
+    def on_emoji_slot_clicked(self, slot: Button):
+        if slot.emoji_index < 0:
+            return
+        self.copy_emoji_to_clipboard(self._emojis.chars[slot.emoji_index])
+        self.close_picker()
+
     def update_selection(self, new_index: int):
         buttons = self.get_all_emoji_buttons()
         if not buttons:
@@ -209,16 +230,7 @@ class EmojiPickerMenu(Box):
             self.selected_index = -1
 
     def get_all_emoji_buttons(self):
-        buttons = []
-        current_page = self.stack.get_visible_child()
-        if (
-            current_page
-            and current_page.get_children()
-            and current_page.get_children()[0].get_children()
-        ):
-            for row_box in current_page.get_children()[0].get_children():
-                buttons.extend(row_box.get_children())
-        return buttons
+        return self._slots[: self._bound_count]
 
     def on_search_entry_activate(self, text):
         buttons = self.get_all_emoji_buttons()
@@ -243,8 +255,8 @@ class EmojiPickerMenu(Box):
         if total_items_current_page == 0:
             return
 
-        rows = 3
-        columns = 9
+        rows = self.per_column
+        columns = self.per_row
 
         if self.selected_index == -1:
             if keyval in (Gdk.KEY_Down, Gdk.KEY_Right):
@@ -282,6 +294,7 @@ class EmojiPickerMenu(Box):
                     current_col = col  # Keep track of current column
                     self.current_page_index += 1
                     self.load_page(self.current_page_index)
+                    total_items_current_page = self._bound_count
                     new_index = current_col  # Try to keep the same column
                     if (
                         new_index >= total_items_current_page
@@ -297,6 +310,7 @@ class EmojiPickerMenu(Box):
                     current_col = col  # Keep track of current column
                     self.current_page_index -= 1
                     self.load_page(self.current_page_index)
+                    total_items_current_page = self._bound_count
                     new_index = (
                         rows - 1
                     ) * columns + current_col  # Select last row, same column
@@ -324,6 +338,7 @@ class EmojiPickerMenu(Box):
     def copy_emoji_to_clipboard(self, emoji_char: str):
         try:
             subprocess.run(["wl-copy"], input=emoji_char.encode("utf-8"), check=True)
+            self.usage.record(emoji_char)
         except subprocess.CalledProcessError as e:
             logger.exception(f"Clipboard copy failed: {e}")
 
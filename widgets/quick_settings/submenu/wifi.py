@@ -1,4 +1,5 @@
 import gi
+from fabric.utils import logger
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.centerbox import CenterBox
@@ -8,7 +9,7 @@ from fabric.widgets.label import Label
 from fabric.widgets.scrolledwindow import ScrolledWindow
 from fabric.widgets.revealer import Revealer
 from gi.repository import Gtk, GLib
-from typing import Any, Dict, List, cast, Callable, Tuple, Optional
+from typing import Any, Dict, List, Set, cast, Callable, Tuple, Optional
 
 from shared.buttons import HoverButton, QSChevronButton, ScanButton
 from shared.list import ListBox
@@ -26,6 +27,9 @@ except ImportError:
 
 gi.require_versions({"Gtk": "3.0"})
 
+# Least time between two re-sorts of the network list, in milliseconds
+RESORT_INTERVAL = 1000
+
 
 class PasswordEntry(Box):
     def __init__(
@@ -175,6 +179,7 @@ class WifiNetworkBox(Box):
         self.strength = network.get("strength", 0)
         self.is_secured = network.get("secured", False)
         self._is_connecting = False
+        self._button_handler: int | None = None
 
         # Main network info row
         self.network_row = CenterBox(
@@ -250,7 +255,7 @@ class WifiNetworkBox(Box):
 
         # Update Signal Icon
         new_icon_char = self._get_strength_icon(self.strength)
-        if hasattr(self, "icon_label"):
+        if self.icon_label.get_label() != new_icon_char:
             self.icon_label.set_label(new_icon_char)
 
         # Only update button/connection state if changed
@@ -263,12 +268,18 @@ class WifiNetworkBox(Box):
         self._hide_auth_dialog()
 
     def _setup_button_state(self):
+        if self._button_handler is not None:
+            self.connect_button.disconnect(self._button_handler)
         if self.is_active:
             self.connect_button.set_label("Disconnect")
-            self.connect_button.connect("clicked", self._on_disconnect_clicked)
+            self._button_handler = self.connect_button.connect(
+                "clicked", self._on_disconnect_clicked
+            )
         else:
             self.connect_button.set_label("Connect")
-            self.connect_button.connect("clicked", self._on_connect_clicked)
+            self._button_handler = self.connect_button.connect(
+                "clicked", self._on_connect_clicked
+            )
 
     def _on_connect_clicked(self, *_):
         if self._is_connecting:
@@ -305,11 +316,15 @@ class WifiNetworkBox(Box):
 
     def _connect_with_saved_credentials(self):
         self._set_connecting_state()
-        self.network_service.connect_wifi_bssid(self.bssid)
+        self.network_service.connect_wifi_bssid(
+            self.bssid, callback=self._on_connection_result
+        )
 
     def _connect_open_network(self):
         self._set_connecting_state()
-        self.network_service.connect_wifi_bssid(self.bssid)
+        self.network_service.connect_wifi_bssid(
+            self.bssid, callback=self._on_connection_result
+        )
 
     def connect_with_password(self, password: str):
         self._set_connecting_state()
@@ -333,7 +348,7 @@ class WifiNetworkBox(Box):
             self.connect_button.set_label("Connected")
         else:
             self.connect_button.set_label("Connect")
-            print(f"WiFi connection failed: {error}")
+            logger.warning(f"[WiFi] Connection failed: {error}")
 
     def reset_state(self):
         self._is_connecting = False
@@ -360,15 +375,33 @@ class WifiNetworkBox(Box):
 
 
 class WifiSubMenu(QuickSubMenu):
-    """A submenu to display WiFi settings and network list."""
+    """
+    A submenu to display WiFi settings and network list.
+
+    The list follows the access point deltas of the Wifi service: only rows of
+    the SSIDs that changed are updated, once per main loop iteration, and the
+    list is re-sorted at most every `RESORT_INTERVAL`. Nothing is tracked
+    while the submenu is hidden, it is synced once when revealed again.
+    """
 
     def __init__(self, **kwargs):
         self.network_service = NetworkService()
         self.wifi: Wifi | None = None
         self._wifi_signals: List[int] = []
 
-        # Dictionary to track existing widgets (SSID -> (Gtk.ListBoxRow, WifiNetworkBox))
+        # Existing widgets by SSID, as (Gtk.ListBoxRow, WifiNetworkBox)
         self.network_widgets: Dict[str, Tuple[Gtk.ListBoxRow, WifiNetworkBox]] = {}
+        # SSID -> BSSID -> access point record, a row shows the strongest one
+        self._networks: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._bssid_ssids: Dict[str, str] = {}
+        self._active_ssid: str | None = None
+        # SSIDs whose rows are out of date
+        self._dirty: Set[str] = set()
+        self._reconcile_id: int | None = None
+        self._resort_id: int | None = None
+        self._last_resort = 0
+        # Set while hidden, the list is synced on the next reveal
+        self._stale = True
 
         self.separator = Separator(
             orientation="horizontal",
@@ -444,6 +477,7 @@ class WifiSubMenu(QuickSubMenu):
             "device-ready", self._on_device_ready
         )
         self.connect("destroy", self._on_destroy)
+        self.revealer.connect("notify::reveal-child", self._on_reveal_changed)
 
         if self.network_service.wifi_device:
             self._setup_wifi_device(self.network_service.wifi_device)
@@ -475,6 +509,7 @@ class WifiSubMenu(QuickSubMenu):
                 except Exception:
                     pass
         self._wifi_signals.clear()
+        self._cancel_updates()
 
     def _on_device_ready(self, *_):
         if self.network_service.wifi_device and not self.wifi:
@@ -486,17 +521,57 @@ class WifiSubMenu(QuickSubMenu):
             self.wifi.connect("changed", self._on_wifi_changed),
             self.wifi.connect("notify::enabled", self._on_wifi_enabled_changed),
             self.wifi.connect("scanning", self._on_scanning_changed),
+            self.wifi.connect("ap-added", self._on_ap_added),
+            self.wifi.connect("ap-removed", self._on_ap_removed),
+            self.wifi.connect("ap-changed", self._on_ap_changed),
         ]
         self._update_header_state()
-        self._populate_networks()
+        self._stale = True
+        if self._is_shown():
+            self._sync_networks()
+
+    def _is_shown(self) -> bool:
+        return self.revealer.get_reveal_child()
+
+    def _on_reveal_changed(self, *_):
+        if self._is_shown():
+            if self._stale:
+                self._sync_networks()
+        else:
+            self._stale = True
+            self._cancel_updates()
 
     def _on_wifi_changed(self, *_):
         self._update_header_state()
-        self._populate_networks()
+        if self._stale:
+            return
+        active_ssid = self._current_active_ssid()
+        if active_ssid != self._active_ssid:
+            # The rows swap lists, everything else is left alone
+            self._mark_dirty(self._active_ssid, active_ssid)
+            self._active_ssid = active_ssid
 
     def _on_wifi_enabled_changed(self, *_):
         self._update_header_state()
-        self._populate_networks()
+        self._stale = True
+        if self._is_shown():
+            self._sync_networks()
+
+    def _on_ap_added(self, _wifi, record: Dict[str, Any]):
+        if not self._stale:
+            self._add_record(record)
+
+    def _on_ap_removed(self, _wifi, bssid: str):
+        if not self._stale:
+            self._remove_record(bssid)
+
+    def _on_ap_changed(self, _wifi, record: Dict[str, Any]):
+        if self._stale:
+            return
+        # Updated in place unless the SSID itself changed
+        if self._bssid_ssids.get(record["bssid"]) != record.get("ssid"):
+            self._remove_record(record["bssid"])
+        self._add_record(record)
 
     def _on_scanning_changed(self, wifi, is_scanning: bool):
         """Handle scanning state changes."""
@@ -517,37 +592,77 @@ class WifiSubMenu(QuickSubMenu):
             if ssid != requesting_ssid:
                 widget.close_auth()
 
-    def _populate_networks(self):
-        """Populate or update the network lists without destroying active inputs."""
-        if not self.wifi or not self.wifi.enabled:
-            self.connected_network_container.set_visible(False)
-            self.available_networks_container.set_visible(False)
-            self._clear_all_networks()
-            return
+    def _current_active_ssid(self) -> str | None:
+        if not self.wifi or self.wifi.state != "activated":
+            return None
+        return self.wifi.ssid
 
-        access_points = cast(List[Dict[str, Any]], self.wifi.access_points)
-        current_ssid = self.wifi.ssid
-        is_connected = self.wifi.state == "activated"
+    def _add_record(self, record: Dict[str, Any]):
+        ssid = record.get("ssid", "Unknown")
+        if not ssid or ssid == "Unknown":
+            return
+        self._networks.setdefault(ssid, {})[record["bssid"]] = record
+        self._bssid_ssids[record["bssid"]] = ssid
+        self._mark_dirty(ssid)
 
-        # Note: We sort here for initial iteration order, but the listbox sort func
-        # handles the visual order.
-        sorted_aps = sorted(
-            access_points, key=lambda x: x.get("strength", 0), reverse=True
-        )
+    def _remove_record(self, bssid: str):
+        ssid = self._bssid_ssids.pop(bssid, None)
+        if ssid is None:
+            return
+        records = self._networks[ssid]
+        del records[bssid]
+        if not records:
+            del self._networks[ssid]
+        self._mark_dirty(ssid)
+
+    def _mark_dirty(self, *ssids: str | None):
+        self._dirty.update(ssid for ssid in ssids if ssid is not None)
+        if self._dirty and self._reconcile_id is None:
+            self._reconcile_id = GLib.idle_add(self._reconcile)
+
+    def _cancel_updates(self):
+        for source_id in (self._reconcile_id, self._resort_id):
+            if source_id is not None:
+                GLib.source_remove(source_id)
+        self._reconcile_id = None
+        self._resort_id = None
+        self._dirty.clear()
+
+    def _sync_networks(self):
+        """Rebuild the tracked networks from the service and reconcile all rows."""
+        self._cancel_updates()
+        self._stale = False
+        stale_ssids = set(self.network_widgets)
+        self._networks.clear()
+        self._bssid_ssids.clear()
 
-        seen_ssids = set()
-        connected_added = False
-        available_count = 0
+        if not self.wifi or not self.wifi.enabled:
+            self._active_ssid = None
+            self._clear_all_networks()
+            return
 
-        for ap in sorted_aps:
-            ssid = ap.get("ssid", "Unknown")
-            if not ssid or ssid == "Unknown" or ssid in seen_ssids:
+        self._active_ssid = self._current_active_ssid()
+        for record in cast(List[Dict[str, Any]], self.wifi.access_points):
+            self._add_record(record)
+        self._dirty |= stale_ssids
+        self._reconcile()
+        self._resort()
+
+    def _reconcile(self) -> bool:
+        """Bring the rows of the dirty SSIDs up to date."""
+        self._reconcile_id = None
+        dirty, self._dirty = self._dirty, set()
+        reordered = False
+
+        for ssid in dirty:
+            records = self._networks.get(ssid)
+            if not records:
+                if (entry := self.network_widgets.pop(ssid, None)) is not None:
+                    entry[0].destroy()
                 continue
 
-            seen_ssids.add(ssid)
-            is_active = ssid == current_ssid and is_connected
-
-            # Determine target listbox
+            ap = max(records.values(), key=lambda record: record.get("strength", 0))
+            is_active = ssid == self._active_ssid
             target_listbox = (
                 self.connected_network_listbox
                 if is_active
@@ -555,8 +670,8 @@ class WifiSubMenu(QuickSubMenu):
             )
 
             if ssid in self.network_widgets:
-                # Update existing widget
                 row, network_box = self.network_widgets[ssid]
+                reordered |= network_box.strength != ap.get("strength", 0)
                 network_box.update(ap, is_active)
 
                 # Move between lists if status changed (e.g. connecting -> connected)
@@ -564,9 +679,9 @@ class WifiSubMenu(QuickSubMenu):
                 if parent != target_listbox:
                     if parent:
                         parent.remove(row)
+                    # Inserted at its sorted position
                     target_listbox.add(row)
             else:
-                # Create new widget
                 network_row = Gtk.ListBoxRow(visible=True, name="wifi-network-row")
                 network_box = WifiNetworkBox(
                     network=ap,
@@ -576,34 +691,41 @@ class WifiSubMenu(QuickSubMenu):
                     on_auth_request=self._on_network_auth_request,
                 )
                 network_row.add(network_box)
+                network_row.show_all()
                 target_listbox.add(network_row)
                 self.network_widgets[ssid] = (network_row, network_box)
 
-            # Update counters
-            if is_active:
-                connected_added = True
-            else:
-                available_count += 1
+        connected = self._active_ssid in self.network_widgets
+        self.connected_network_container.set_visible(connected)
+        self.available_networks_container.set_visible(
+            len(self.network_widgets) > int(connected)
+        )
 
-        # Remove networks that are no longer present
-        for ssid in list(self.network_widgets.keys()):
-            if ssid not in seen_ssids:
-                row, _ = self.network_widgets.pop(ssid)
-                row.destroy()
+        if reordered:
+            self._request_resort()
+        return False
 
-        # Update visibility and ensure sorting is applied
-        self.connected_network_container.set_visible(connected_added)
-        self.available_networks_container.set_visible(available_count > 0)
+    def _request_resort(self):
+        if self._resort_id is not None:
+            return
+        elapsed = (GLib.get_monotonic_time() - self._last_resort) // 1000
+        self._resort_id = GLib.timeout_add(
+            max(0, RESORT_INTERVAL - elapsed), self._resort
+        )
 
+    def _resort(self) -> bool:
+        self._resort_id = None
+        self._last_resort = GLib.get_monotonic_time()
         self.available_networks_listbox.invalidate_sort()
-        self.connected_network_listbox.show_all()
-        self.available_networks_listbox.show_all()
+        return False
 
     def _clear_all_networks(self):
         """Completely clear networks (e.g. when WiFi is disabled)."""
         for row, _ in self.network_widgets.values():
             row.destroy()
         self.network_widgets.clear()
+        self.connected_network_container.set_visible(False)
+        self.available_networks_container.set_visible(False)
 
     def _update_header_state(self):
         """Update the header label based on connection state."""